@@ -1,22 +1,50 @@
 """
 Google ADK Configuration with MCP and Context Engineering
 """
+import atexit
+import functools
+import itertools
+import json
+import logging
+import logging.handlers
 import os
-from typing import Any, Dict, List
-import google.adk as adk
-from google.adk import sessions, tools
+import queue
+from collections import Counter, deque
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+# Output fields holding encoded binary data, excluded from prompt summaries
+BINARY_FIELD_SUFFIXES = ("_base64",)
 
 
 class ContextManager:
     """Context engineering for multi-agent communication"""
     
     def __init__(self):
-        self.conversation_history: List[Dict[str, Any]] = []
+        # Sliding window: oldest messages are dropped once the cap is reached
+        self.conversation_history: Deque[Dict[str, Any]] = deque(maxlen=ADKConfig.MAX_HISTORY_MESSAGES)
+        self._evicted_messages: Counter = Counter()
         self.artifact_context: Dict[str, Any] = {}
-        self.agent_outputs: Dict[str, Any] = {}
+        # Struct-of-arrays: prompt-facing summaries kept apart from full outputs
+        self.agent_summaries: Dict[str, str] = {}
+        self.agent_artifacts: Dict[str, Any] = {}
+        
+        # Prompt memoization: mutators take a fresh version; next() on a
+        # count is atomic, so concurrent writers never share a version
+        self._versions = itertools.count(1)
+        self._ctx_version = 0
+        self._prompt_cache: Tuple[int, str] = (0, "")
+        
+    def _touch(self):
+        """Mark context as changed so the cached prompt is rebuilt"""
+        self._ctx_version = next(self._versions)
         
     def add_message(self, agent: str, role: str, content: str):
         """Add message to conversation history"""
+        if len(self.conversation_history) == self.conversation_history.maxlen:
+            self._record_evicted(self.conversation_history[0])
         self.conversation_history.append({
             "agent": agent,
             "role": role,
@@ -24,9 +52,18 @@ class ContextManager:
             "timestamp": self._get_timestamp()
         })
         
+    def _record_evicted(self, message: Dict[str, Any]):
+        """Fold a message leaving the history window into a compact summary"""
+        self._evicted_messages[message["agent"]] += 1
+        self.artifact_context["history_summary"] = "Earlier messages trimmed: " + ", ".join(
+            f"{agent} x{count}" for agent, count in self._evicted_messages.items()
+        )
+        self._touch()
+        
     def set_artifact_context(self, key: str, value: Any):
         """Store artifact-specific context"""
         self.artifact_context[key] = value
+        self._touch()
         
     def get_artifact_context(self, key: str = None) -> Any:
         """Retrieve artifact context"""
@@ -34,45 +71,167 @@ class ContextManager:
             return self.artifact_context.get(key)
         return self.artifact_context
         
-    def store_agent_output(self, agent_name: str, output: Any):
-        """Store output from an agent for sequential handoff"""
-        self.agent_outputs[agent_name] = output
+    def store_agent_output(self, agent_name: str, summary: Optional[str] = None, artifacts: Any = None):
+        """Store output from an agent for sequential handoff
+        
+        Only the summary is injected into later prompts; artifacts (full
+        outputs, base64 images) are kept for code access only. When no summary
+        is given it is sliced from the artifacts using ADKConfig.HANDOFF_KEYS.
+        """
+        if summary is None:
+            summary = self._summarize_output(agent_name, artifacts)
+        self.agent_summaries[agent_name] = summary
+        self.agent_artifacts[agent_name] = artifacts
+        self._touch()
+        
+    @staticmethod
+    def _summarize_output(agent_name: str, output: Any) -> str:
+        """Extract the handoff fields of an agent output as prompt text"""
+        if not isinstance(output, dict):
+            return str(output)
+        keys = ADKConfig.HANDOFF_KEYS.get(agent_name)
+        if not keys:
+            # Serialized once here; binary payloads never reach the prompt
+            return json.dumps(
+                {key: value for key, value in output.items() if not key.endswith(BINARY_FIELD_SUFFIXES)},
+                default=str
+            )
+        return "\n".join(f"{key}: {output[key]}" for key in ("status", "message") + keys if key in output)
         
     def get_agent_output(self, agent_name: str) -> Any:
-        """Get output from previous agent"""
-        return self.agent_outputs.get(agent_name)
+        """Get full output (artifacts) from previous agent"""
+        return self.agent_artifacts.get(agent_name)
         
     def build_context_prompt(self, current_agent: str) -> str:
-        """Build rich context prompt for current agent"""
-        context_parts = []
+        """Build rich context prompt for current agent (memoized until context changes)"""
+        version = self._ctx_version
+        cached_version, cached_prompt = self._prompt_cache
+        if version == cached_version:
+            return cached_prompt
         
-        # Add artifact context
-        if self.artifact_context:
-            context_parts.append("=== ARTIFACT CONTEXT ===")
-            for key, value in self.artifact_context.items():
-                context_parts.append(f"{key}: {value}")
-            context_parts.append("")
+        # Snapshot items: agents may store outputs concurrently
+        artifact_items = list(self.artifact_context.items())
+        summary_items = list(self.agent_summaries.items())
+        sections = []
+        if artifact_items:
+            lines = "\n".join(f"{key}: {value}" for key, value in artifact_items)
+            sections.append(f"=== ARTIFACT CONTEXT ===\n{lines}\n")
+        if summary_items:
+            blocks = "\n".join(f"\n--- {agent} Output ---\n{summary}" for agent, summary in summary_items)
+            sections.append(f"=== PREVIOUS AGENT OUTPUTS ===\n{blocks}\n")
+        prompt = "\n".join(sections)
         
-        # Add previous agent outputs
-        if self.agent_outputs:
-            context_parts.append("=== PREVIOUS AGENT OUTPUTS ===")
-            for agent, output in self.agent_outputs.items():
-                context_parts.append(f"\n--- {agent} Output ---")
-                context_parts.append(str(output))
-            context_parts.append("")
-        
-        return "\n".join(context_parts)
+        self._prompt_cache = (version, prompt)
+        return prompt
         
     def _get_timestamp(self) -> str:
         """Get current timestamp"""
-        from datetime import datetime
         return datetime.now().isoformat()
         
     def clear(self):
         """Clear all context"""
         self.conversation_history.clear()
+        self._evicted_messages.clear()
         self.artifact_context.clear()
-        self.agent_outputs.clear()
+        self.agent_summaries.clear()
+        self.agent_artifacts.clear()
+        self._touch()
+
+
+# MCP tool schemas are immutable, so build them once at import
+IMAGE_ANALYSIS_TOOL = MappingProxyType({
+    "name": "analyze_artifact_image",
+    "description": "Analyze an artifact image to identify type, condition, and damage",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "image_path": {
+                "type": "string",
+                "description": "Path to the artifact image"
+            },
+            "focus_areas": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Specific areas to focus analysis on"
+            }
+        },
+        "required": ["image_path"]
+    }
+})
+
+RESTORATION_TOOL = MappingProxyType({
+    "name": "generate_restoration",
+    "description": "Generate a pristine version of the damaged artifact using DALL-E 3",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "artifact_description": {
+                "type": "string",
+                "description": "Detailed description of the artifact"
+            },
+            "damage_assessment": {
+                "type": "string",
+                "description": "Assessment of damage and missing parts"
+            },
+            "artifact_type": {
+                "type": "string",
+                "enum": ["painting", "sculpture", "monument", "textile", "pottery"],
+                "description": "Type of artifact"
+            }
+        },
+        "required": ["artifact_description", "damage_assessment", "artifact_type"]
+    }
+})
+
+HISTORICAL_SEARCH_TOOL = MappingProxyType({
+    "name": "search_artifact_history",
+    "description": "Search for historical information about artifacts",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "artifact_name": {
+                "type": "string",
+                "description": "Name or description of the artifact"
+            },
+            "period": {
+                "type": "string",
+                "description": "Historical period (e.g., Renaissance, Ancient Egypt)"
+            },
+            "culture": {
+                "type": "string",
+                "description": "Cultural origin"
+            }
+        },
+        "required": ["artifact_name"]
+    }
+})
+
+DEGRADATION_PREDICTION_TOOL = MappingProxyType({
+    "name": "predict_degradation",
+    "description": "Predict future degradation based on environmental factors",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "material": {
+                "type": "string",
+                "description": "Primary material of the artifact"
+            },
+            "location": {
+                "type": "string",
+                "description": "Current or intended storage location"
+            },
+            "time_span": {
+                "type": "integer",
+                "description": "Number of years to predict"
+            },
+            "current_condition": {
+                "type": "string",
+                "description": "Current condition assessment"
+            }
+        },
+        "required": ["material", "time_span"]
+    }
+})
 
 
 class MCPTools:
@@ -81,108 +240,37 @@ class MCPTools:
     @staticmethod
     def create_image_analysis_tool():
         """Tool for analyzing artifact images"""
-        return {
-            "name": "analyze_artifact_image",
-            "description": "Analyze an artifact image to identify type, condition, and damage",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "image_path": {
-                        "type": "string",
-                        "description": "Path to the artifact image"
-                    },
-                    "focus_areas": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Specific areas to focus analysis on"
-                    }
-                },
-                "required": ["image_path"]
-            }
-        }
+        return IMAGE_ANALYSIS_TOOL
     
     @staticmethod
     def create_restoration_tool():
         """Tool for generating restored artifact images"""
-        return {
-            "name": "generate_restoration",
-            "description": "Generate a pristine version of the damaged artifact using DALL-E 3",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "artifact_description": {
-                        "type": "string",
-                        "description": "Detailed description of the artifact"
-                    },
-                    "damage_assessment": {
-                        "type": "string",
-                        "description": "Assessment of damage and missing parts"
-                    },
-                    "artifact_type": {
-                        "type": "string",
-                        "enum": ["painting", "sculpture", "monument", "textile", "pottery"],
-                        "description": "Type of artifact"
-                    }
-                },
-                "required": ["artifact_description", "damage_assessment", "artifact_type"]
-            }
-        }
+        return RESTORATION_TOOL
     
     @staticmethod
     def create_historical_search_tool():
         """Tool for searching historical artifact databases"""
-        return {
-            "name": "search_artifact_history",
-            "description": "Search for historical information about artifacts",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "artifact_name": {
-                        "type": "string",
-                        "description": "Name or description of the artifact"
-                    },
-                    "period": {
-                        "type": "string",
-                        "description": "Historical period (e.g., Renaissance, Ancient Egypt)"
-                    },
-                    "culture": {
-                        "type": "string",
-                        "description": "Cultural origin"
-                    }
-                },
-                "required": ["artifact_name"]
-            }
-        }
+        return HISTORICAL_SEARCH_TOOL
     
     @staticmethod
     def create_degradation_prediction_tool():
         """Tool for predicting environmental degradation"""
-        return {
-            "name": "predict_degradation",
-            "description": "Predict future degradation based on environmental factors",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "material": {
-                        "type": "string",
-                        "description": "Primary material of the artifact"
-                    },
-                    "location": {
-                        "type": "string",
-                        "description": "Current or intended storage location"
-                    },
-                    "time_span": {
-                        "type": "integer",
-                        "description": "Number of years to predict"
-                    },
-                    "current_condition": {
-                        "type": "string",
-                        "description": "Current condition assessment"
-                    }
-                },
-                "required": ["material", "time_span"]
-            }
-        }
+        return DEGRADATION_PREDICTION_TOOL
+
+
+MCP_TOOL_REGISTRY = MappingProxyType({
+    "vision": IMAGE_ANALYSIS_TOOL,
+    "restoration": RESTORATION_TOOL,
+    "historical": HISTORICAL_SEARCH_TOOL,
+    "environmental": DEGRADATION_PREDICTION_TOOL
+})
+
+
+def _read_api_key() -> Optional[str]:
+    return os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
+
+
+_API_KEY = _read_api_key()
 
 
 class ADKConfig:
@@ -192,9 +280,24 @@ class ADKConfig:
     MODEL_NAME = "gemini-2.0-flash-exp"
     FALLBACK_MODEL = "gemini-2.0-flash"
     
+    # Gemini SDK transport shared by all agents. Unset keeps the SDK default,
+    # which pairs sync calls with grpc and generate_content_async with grpc_asyncio;
+    # forcing 'grpc' would break the async calls.
+    GENAI_TRANSPORT = os.getenv('ADK_GENAI_TRANSPORT') or None
+    GENAI_ENDPOINT = os.getenv('ADK_GENAI_ENDPOINT', 'generativelanguage.googleapis.com')
+    
+    # Log initialization/progress details (set ADK_VERBOSE=false to silence)
+    VERBOSE = os.getenv('ADK_VERBOSE', 'true').lower() == 'true'
+    
+    # Rotating log file for server errors and tracebacks (ADK_LOG_FILE= disables it)
+    LOG_FILE = os.getenv('ADK_LOG_FILE', os.path.join('logs', 'artifact_restoration.log'))
+    LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+    LOG_FILE_BACKUPS = 3
+    
     # Session configuration
     SESSION_TTL = 3600  # 1 hour
     MAX_CONTEXT_LENGTH = 100000
+    MAX_HISTORY_MESSAGES = 200  # Conversation history sliding window
     
     # Agent names
     AGENT_NAMES = {
@@ -202,26 +305,168 @@ class ADKConfig:
         "restoration": "RestorationAgent", 
         "historical": "HistoricalDataAgent",
         "environmental": "EnvironmentalAgent",
+        "fused": "FusedReportAgent",
         "orchestrator": "OrchestratorAgent"
     }
     
+    # Upper bound on artifacts processed concurrently in a batch (Gemini QPM limits)
+    MAX_CONCURRENT_REQUESTS = int(os.getenv('ADK_MAX_CONCURRENT_REQUESTS', '8'))
+    
+    # Background job queue for /process_artifact (unset runs workflows in the request).
+    # Web and worker hosts exchange files by path, so UPLOAD_DIR and
+    # ADK_RESTORED_DIR must be the same shared volume on both.
+    REDIS_URL = os.getenv('ADK_REDIS_URL')
+    JOB_QUEUE = "artifact_restoration"
+    JOB_TIMEOUT = 600  # seconds a worker may spend on one workflow
+    JOB_RESULT_TTL = 3600  # seconds finished results stay pollable
+    
+    # Saved uploads, deleted by a janitor once their workflow ends
+    UPLOAD_DIR = os.path.abspath(os.getenv('ADK_UPLOAD_DIR', 'uploads'))
+    
+    # Agent result cache keyed by image hash (ADK_CACHE_DIR persists it via
+    # diskcache; point every worker at the same directory to share results)
+    RESULT_CACHE = os.getenv('ADK_RESULT_CACHE', 'true').lower() == 'true'
+    CACHE_DIR = os.getenv('ADK_CACHE_DIR')
+    CACHE_MAX_ITEMS = 256
+    
+    # Seconds a restored image is kept on disk; cached results pointing at
+    # an expired file are regenerated
+    RESTORED_IMAGE_TTL = int(os.getenv('ADK_RESTORED_IMAGE_TTL', '86400'))
+    
+    # Reuse historical/environmental responses for near-duplicate prompts
+    # (needs sentence-transformers and faiss)
+    SEMANTIC_CACHE = os.getenv('ADK_SEMANTIC_CACHE', 'false').lower() == 'true'
+    SEMANTIC_CACHE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    SEMANTIC_CACHE_THRESHOLD = 0.92
+    
+    # Single structured Gemini call instead of ADKOrchestrator's 4-agent chain (falls back on error)
+    FUSED_WORKFLOW = os.getenv('ADK_FUSED_WORKFLOW', 'false').lower() == 'true'
+    
+    # One structured call for RootAgent's restoration/historical/environmental
+    # text instead of three chained calls (falls back on error)
+    FUSED_ANALYSIS = os.getenv('ADK_FUSED_ANALYSIS', 'false').lower() == 'true'
+    
+    # Precomputed MCP tool registry (read-only)
+    MCP_TOOLS = MCP_TOOL_REGISTRY
+    
+    # Output fields each agent hands off to later agents' prompts
+    HANDOFF_KEYS = {
+        "vision": ("type", "artifact_name", "material", "period", "origin",
+                   "location", "condition", "description", "confidence"),
+        "restoration": ("restoration_method",),
+        "historical": ("historical_context",),
+        "environmental": ("predictions", "years_analyzed")
+    }
+    
+    # Retrieval gating: skip historical lookup below this identification
+    # confidence (between "low" and "medium", so Low identifications skip it;
+    # a missing or unrecognized confidence never does)
+    MIN_HISTORICAL_CONFIDENCE = 0.4
+    CONFIDENCE_LEVELS = {
+        "high": 0.9,
+        "medium": 0.6,
+        "low": 0.3
+    }
+    
     # Temperature settings for different tasks
     TEMPERATURES = {
         "vision_analysis": 0.1,  # Low for factual analysis
         "restoration": 0.7,      # Medium-high for creative generation
         "historical": 0.2,       # Low for factual retrieval
-        "environmental": 0.3     # Low-medium for predictions
+        "environmental": 0.3,    # Low-medium for predictions
+        "fused_report": 0.2      # Low: mostly factual sections in one call
     }
     
     @staticmethod
     def get_api_key() -> str:
-        """Get Google API key from environment"""
-        key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-        if not key:
-            raise ValueError("GOOGLE_API_KEY or GEMINI_API_KEY must be set")
-        return key
+        """Get Google API key (resolved at import, re-read if still unset)"""
+        global _API_KEY
+        if not _API_KEY:
+            # Environment may be populated after import (e.g. load_dotenv)
+            _API_KEY = _read_api_key()
+            if not _API_KEY:
+                raise ValueError("GOOGLE_API_KEY or GEMINI_API_KEY must be set")
+        return _API_KEY
     
     @staticmethod
     def get_openai_key() -> str:
         """Get OpenAI API key for DALL-E"""
         return os.getenv('OPENAI_API_KEY', '')
+
+
+_configured = False
+
+
+def configure_genai():
+    """Configure the Gemini SDK once per process"""
+    global _configured
+    if not _configured:
+        # Deferred: the SDK pulls in grpc/protobuf, which config readers don't need
+        import google.generativeai as genai
+        # One transport/channel for the whole process; reconfiguring per
+        # agent would drop the pooled connection
+        options = {"client_options": {"api_endpoint": ADKConfig.GENAI_ENDPOINT}}
+        if ADKConfig.GENAI_TRANSPORT:
+            options["transport"] = ADKConfig.GENAI_TRANSPORT
+        genai.configure(api_key=ADKConfig.get_api_key(), **options)
+        _configured = True
+
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: int = logging.INFO, log_file: Optional[str] = None):
+    """Route root logging through a queue so log I/O never blocks agent threads
+    
+    Records are enqueued by a QueueHandler and written to stderr, and to a
+    rotating log_file if given, by a QueueListener thread. Safe to call more
+    than once.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    handlers = [stream_handler]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=ADKConfig.LOG_FILE_MAX_BYTES,
+            backupCount=ADKConfig.LOG_FILE_BACKUPS, encoding='utf-8'
+        )
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handlers.append(file_handler)
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+@functools.lru_cache(maxsize=None)
+def get_model(name: str, temperature: Optional[float] = None, system_instruction: Optional[str] = None,
+              response_schema: Any = None):
+    """Process-wide GenerativeModel per configuration
+    
+    Args:
+        name: Gemini model name
+        temperature: Sampling temperature (model default if None)
+        system_instruction: System prompt sent once with every request
+        response_schema: Schema class for structured JSON output
+    """
+    import google.generativeai as genai
+    configure_genai()
+    generation_config = {}
+    if temperature is not None:
+        generation_config["temperature"] = temperature
+    if response_schema is not None:
+        generation_config["response_mime_type"] = "application/json"
+        generation_config["response_schema"] = response_schema
+    return genai.GenerativeModel(
+        model_name=name,
+        system_instruction=system_instruction,
+        generation_config=generation_config or None
+    )
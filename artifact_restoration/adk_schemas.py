@@ -0,0 +1,71 @@
+"""
+Structured output schemas for Gemini responses and RootAgent handoff results
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class ArtifactIdentification(BaseModel):
+    """Vision identification fields (keys match ADKConfig.HANDOFF_KEYS["vision"])"""
+    artifact_name: str
+    type: str
+    material: str
+    period: str
+    origin: str
+    location: str
+    condition: str
+    damage: List[str]
+    missing_parts: List[str]
+    description: str
+    confidence: str
+
+
+class ArtifactReport(BaseModel):
+    """All four agent sections returned by a single Gemini call"""
+    vision_analysis: str
+    artifact_type: str
+    material: str
+    condition: str
+    restoration: str
+    historical_context: str
+    environmental_predictions: str
+
+
+class FusedAnalysis(BaseModel):
+    """RootAgent restoration, historical and environmental sections from one Gemini call"""
+    restoration: str
+    historical_context: str
+    environmental_timeline: str
+
+
+@dataclass(slots=True)
+class RestorationResult:
+    """RestorationAgent output handed to the historical and environmental agents"""
+    status: str
+    message: str = ""
+    restored_image_path: Optional[str] = None
+    restoration_level: Optional[str] = None
+    artifact_type: str = "unknown"
+    artifact_identification: str = ""
+    analysis: str = ""
+    image_path: str = ""
+
+
+@dataclass(slots=True)
+class HistoricalResult:
+    """DataFetcherAgent output"""
+    status: str
+    message: str = ""
+    historical_context: str = ""
+
+
+@dataclass(slots=True)
+class EnvironmentalResult:
+    """EnvironmentalAgent output"""
+    status: str
+    message: str = ""
+    time_span_years: int = 0
+    degradation_data: Dict[str, Any] = field(default_factory=dict)
+    environmental_predictions: str = ""
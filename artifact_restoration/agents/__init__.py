@@ -7,10 +7,12 @@ from .adk_root_agent import RootAgent
 from .adk_restoration_agent import RestorationAgent
 from .adk_data_agent import DataFetcherAgent
 from .adk_environmental_agent import EnvironmentalAgent
+from .adk_fused_agent import FusedAnalysisAgent
 
 __all__ = [
     'RootAgent',
     'RestorationAgent',
     'DataFetcherAgent',
-    'EnvironmentalAgent'
+    'EnvironmentalAgent',
+    'FusedAnalysisAgent'
 ]
@@ -1,22 +1,19 @@
 """  
 Data Fetcher Agent using Google Gemini API
 """
-import google.generativeai as genai
-import os
-from typing import Dict, Any
+import logging
+from typing import Callable, Optional
+
+from adk_config import ADKConfig, configure_logging, get_model
+from adk_schemas import HistoricalResult
+
+logger = logging.getLogger(__name__)
 
 
 class DataFetcherAgent:
     """Gemini-based agent for artifact historical data"""
     
     def __init__(self):
-        # Configure API
-        api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-        genai.configure(api_key=api_key)
-        
-        # Use Gemini model directly
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-        
         self.system_prompt = """You are an expert art historian and archaeologist with comprehensive knowledge of global artifacts and access to extensive museum databases.Your expertise includes:
 1. Historical periods and cultural contexts across all civilizations
 2. Material science and conservation techniques  
@@ -33,21 +30,15 @@ When analyzing artifacts:
 
 Provide scholarly, detailed information with specific examples and real museum locations."""
         
-        print("[OK] Data Fetcher Agent initialized")
-    
-    def fetch_context(self, analysis: str, artifact_identification: str = "") -> Dict[str, Any]:
-        """
-        Fetch historical context based on restoration analysis and vision identification
+        # System prompt is sent once as system_instruction instead of per request
+        self.model = get_model('gemini-2.0-flash', system_instruction=self.system_prompt)
         
-        Args:
-            analysis: Text from restoration agent analysis
-            artifact_identification: Vision API identification of the artifact
-            
-        Returns:
-            Dictionary with historical context
-        """
-        try:
-            prompt = f"""You have detailed artifact identification from vision analysis:
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] Data Fetcher Agent initialized")
+    
+    def build_prompt(self, analysis: str, artifact_identification: str) -> str:
+        """Build the historical context task prompt (also used by FusedAnalysisAgent)"""
+        return f"""You have detailed artifact identification from vision analysis:
 
 {artifact_identification}
 
@@ -77,24 +68,57 @@ Climate: [temperature/humidity]
 [Current preservation approach in 1-2 sentences]
 
 Be specific and factual. If this is a famous artifact, state its exact name and real location."""
+    
+    def fetch_context(self, analysis: str, artifact_identification: str = "") -> HistoricalResult:
+        """
+        Fetch historical context based on restoration analysis and vision identification
+        
+        Args:
+            analysis: Text from restoration agent analysis
+            artifact_identification: Vision API identification of the artifact
+            
+        Returns:
+            HistoricalResult with historical context
+        """
+        try:
+            response = self.model.generate_content(self.build_prompt(analysis, artifact_identification))
+            
+            return HistoricalResult(
+                status="success",
+                historical_context=response.text or "Historical context unavailable"
+            )
             
-            # Use Gemini model
-            full_prompt = f"{self.system_prompt}\n\n{prompt}"
-            response = self.model.generate_content(full_prompt)
-            context_text = response.text if response.text else "Historical context unavailable"
+        except Exception as e:
+            return HistoricalResult(status="error", message=f"Data fetching failed: {str(e)}")
+    
+    async def fetch_context_async(self, analysis: str, artifact_identification: str = "",
+                                  on_chunk: Optional[Callable[[str], None]] = None) -> HistoricalResult:
+        """
+        Async variant of fetch_context (does not block the event loop)
+        
+        The response is streamed; on_chunk, if given, is called with each
+        text chunk as Gemini generates it.
+        """
+        try:
+            response = await self.model.generate_content_async(
+                self.build_prompt(analysis, artifact_identification), stream=True
+            )
+            parts = []
+            async for chunk in response:
+                parts.append(chunk.text)
+                if on_chunk:
+                    on_chunk(chunk.text)
             
-            return {
-                "status": "success",
-                "historical_context": context_text
-            }
+            return HistoricalResult(
+                status="success",
+                historical_context="".join(parts) or "Historical context unavailable"
+            )
             
         except Exception as e:
-            return {
-                "status": "error",
-                "message": f"Data fetching failed: {str(e)}"
-            }
+            return HistoricalResult(status="error", message=f"Data fetching failed: {str(e)}")
 
 
 if __name__ == "__main__":
+    configure_logging()
     agent = DataFetcherAgent()
-    print("[OK] Data Fetcher Agent ready for use")
+    logger.info("[OK] Data Fetcher Agent ready for use")
@@ -1,27 +1,20 @@
 """  
 Environmental Analysis Agent using Google Gemini API
 """
-import google.generativeai as genai
-import os
-from typing import Dict, Any
-import sys
+import logging
+from typing import Any, Callable, Mapping, Optional
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from adk_config import ADKConfig, configure_logging, get_model
+from adk_schemas import EnvironmentalResult
+from tools.restoration_tools import predict_degradation, thaw_degradation
 
-from tools.restoration_tools import predict_degradation
+logger = logging.getLogger(__name__)
 
 
 class EnvironmentalAgent:
     """Gemini-based agent for environmental degradation prediction"""
     
     def __init__(self):
-        # Configure API
-        api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-        genai.configure(api_key=api_key)
-        
-        # Use Gemini model directly
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-        
         self.system_prompt = """You are an expert in materials science, conservation science, and environmental degradation with knowledge of global climate patterns.Your expertise covers:
 1. Environmental factors affecting artifacts (temperature, humidity, light, pollution, climate zones)
 2. Material degradation patterns and timelines for different climates (tropical, temperate, arid, etc.)
@@ -38,25 +31,15 @@ When analyzing environmental impact:
 
 Provide scientifically accurate predictions with specific recommendations based on likely environmental conditions."""
         
-        print("[OK] Environmental Agent initialized")
-    
-    def predict_degradation_timeline(self, historical_context: str, years: int, material: str = "canvas") -> Dict[str, Any]:
-        """
-        Predict environmental degradation over time
+        # System prompt is sent once as system_instruction instead of per request
+        self.model = get_model('gemini-2.0-flash', system_instruction=self.system_prompt)
         
-        Args:
-            historical_context: Text from data fetcher agent
-            years: Number of years to predict
-            material: Primary material of artifact
-            
-        Returns:
-            Dictionary with degradation predictions
-        """
-        try:
-            # Get quantitative prediction
-            degradation_data = predict_degradation(material, years)
-            
-            prompt = f"""Based on this artifact context, provide detailed environmental degradation predictions:
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] Environmental Agent initialized")
+    
+    def build_prompt(self, historical_context: str, years: int, degradation_data: Mapping[str, Any]) -> str:
+        """Build the degradation task prompt (also used by FusedAnalysisAgent)"""
+        prompt = f"""Based on this artifact context, provide detailed environmental degradation predictions:
 
 CONTEXT:
 {historical_context}
@@ -102,26 +85,69 @@ Provide comprehensive analysis:
    - Ongoing maintenance
    - Total over {years} years
 """
+        return f"{prompt}\n\nIMPORTANT: Based on the historical context provided, determine the likely current location of this type of artifact (museum city and country), then analyze the environmental conditions typical of that location."
+    
+    def predict_degradation_timeline(self, historical_context: str, years: int, material: str = "canvas") -> EnvironmentalResult:
+        """
+        Predict environmental degradation over time
+        
+        Args:
+            historical_context: Text from data fetcher agent
+            years: Number of years to predict
+            material: Primary material of artifact
+            
+        Returns:
+            EnvironmentalResult with degradation predictions
+        """
+        try:
+            # Get quantitative prediction
+            degradation_data = predict_degradation(material, years)
+            
+            prompt = self.build_prompt(historical_context, years, degradation_data)
+            response = self.model.generate_content(prompt)
+            
+            return EnvironmentalResult(
+                status="success",
+                time_span_years=years,
+                degradation_data=thaw_degradation(degradation_data),
+                environmental_predictions=response.text or "Environmental predictions unavailable"
+            )
+            
+        except Exception as e:
+            return EnvironmentalResult(status="error", message=f"Environmental analysis failed: {str(e)}")
+    
+    async def predict_degradation_timeline_async(self, historical_context: str, years: int,
+                                                 material: str = "canvas",
+                                                 on_chunk: Optional[Callable[[str], None]] = None) -> EnvironmentalResult:
+        """
+        Async variant of predict_degradation_timeline (does not block the event loop)
+        
+        The response is streamed; on_chunk, if given, is called with each
+        text chunk as Gemini generates it.
+        """
+        try:
+            degradation_data = predict_degradation(material, years)
             
-            # Use Gemini model
-            full_prompt = f"{self.system_prompt}\n\n{prompt}\n\nIMPORTANT: Based on the historical context provided, determine the likely current location of this type of artifact (museum city and country), then analyze the environmental conditions typical of that location."
-            response = self.model.generate_content(full_prompt)
-            predictions_text = response.text if response.text else "Environmental predictions unavailable"
+            prompt = self.build_prompt(historical_context, years, degradation_data)
+            response = await self.model.generate_content_async(prompt, stream=True)
+            parts = []
+            async for chunk in response:
+                parts.append(chunk.text)
+                if on_chunk:
+                    on_chunk(chunk.text)
             
-            return {
-                "status": "success",
-                "time_span_years": years,
-                "degradation_data": degradation_data,
-                "environmental_predictions": predictions_text
-            }
+            return EnvironmentalResult(
+                status="success",
+                time_span_years=years,
+                degradation_data=thaw_degradation(degradation_data),
+                environmental_predictions="".join(parts) or "Environmental predictions unavailable"
+            )
             
         except Exception as e:
-            return {
-                "status": "error",
-                "message": f"Environmental analysis failed: {str(e)}"
-            }
+            return EnvironmentalResult(status="error", message=f"Environmental analysis failed: {str(e)}")
 
 
 if __name__ == "__main__":
+    configure_logging()
     agent = EnvironmentalAgent()
-    print("[OK] Environmental Agent ready for use")
+    logger.info("[OK] Environmental Agent ready for use")
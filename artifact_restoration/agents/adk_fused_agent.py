@@ -0,0 +1,101 @@
+"""
+Fused Analysis Agent: restoration, historical and environmental prompts in one Gemini call
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Any
+
+from adk_config import ADKConfig, get_model
+from adk_schemas import EnvironmentalResult, FusedAnalysis, HistoricalResult
+from tools.restoration_tools import predict_degradation, thaw_degradation
+from .adk_restoration_agent import RestorationAgent
+from .adk_data_agent import DataFetcherAgent
+from .adk_environmental_agent import EnvironmentalAgent
+
+logger = logging.getLogger(__name__)
+
+
+class FusedAnalysisAgent:
+    """Collapses RootAgent's three chained text calls into one structured request"""
+
+    def __init__(self, restoration_agent: RestorationAgent, data_agent: DataFetcherAgent,
+                 environmental_agent: EnvironmentalAgent):
+        self.restoration_agent = restoration_agent
+        self.data_agent = data_agent
+        self.environmental_agent = environmental_agent
+
+        system_instruction = "\n\n".join([
+            "You perform three expert roles in one response. Answer each section of the "
+            "request in the matching JSON field.",
+            f"=== RESTORATION (field: restoration) ===\n{restoration_agent.system_prompt}",
+            f"=== HISTORICAL CONTEXT (field: historical_context) ===\n{data_agent.system_prompt}",
+            f"=== ENVIRONMENTAL (field: environmental_timeline) ===\n{environmental_agent.system_prompt}"
+        ])
+        self.model = get_model(
+            'gemini-2.0-flash',
+            system_instruction=system_instruction,
+            response_schema=FusedAnalysis
+        )
+
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] Fused Analysis Agent initialized")
+
+    async def analyze_async(self, image_path: str, time_span: int = 10,
+                            material: str = "canvas") -> Dict[str, Any]:
+        """
+        Identify and restore the artifact, then answer all text sections at once
+
+        Vision identification stays a separate call since it needs the image.
+
+        Args:
+            image_path: Path to artifact image
+            time_span: Years for environmental prediction
+            material: Primary material of artifact
+
+        Returns:
+            Dictionary with the restoration, data_fetcher and environmental
+            results the individual agents would return
+        """
+        try:
+            prepared = await asyncio.to_thread(self.restoration_agent.identify_and_restore, image_path)
+            if prepared["status"] != "success":
+                return prepared
+
+            degradation_data = predict_degradation(material, time_span)
+            prompt = "\n\n".join([
+                f"=== RESTORATION ===\n{prepared['prompt']}",
+                "=== HISTORICAL CONTEXT ===\n" + self.data_agent.build_prompt(
+                    "(see the restoration section)", prepared["artifact_info"]
+                ),
+                "=== ENVIRONMENTAL ===\n" + self.environmental_agent.build_prompt(
+                    "(use the artifact identity and location from the historical context section)",
+                    time_span, degradation_data
+                )
+            ])
+
+            response = await self.model.generate_content_async(prompt)
+            report = json.loads(response.text)
+
+            return {
+                "status": "success",
+                "restoration": self.restoration_agent.build_result(
+                    prepared, report["restoration"], image_path
+                ),
+                "data_fetcher": HistoricalResult(
+                    status="success",
+                    historical_context=report["historical_context"] or "Historical context unavailable"
+                ),
+                "environmental": EnvironmentalResult(
+                    status="success",
+                    time_span_years=time_span,
+                    degradation_data=thaw_degradation(degradation_data),
+                    environmental_predictions=report["environmental_timeline"] or "Environmental predictions unavailable"
+                )
+            }
+
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Fused analysis failed: {str(e)}"
+            }
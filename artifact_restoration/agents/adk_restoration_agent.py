@@ -1,28 +1,81 @@
 """  
 Restoration Agent using Google Gemini API with DALL-E integration
 """
-import google.generativeai as genai
+import asyncio
+import logging
+import re
+import string
 import os
-from typing import Dict, Any
-import sys
+from typing import AsyncIterator, Dict, Any, Optional
 
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PIL import Image
 
-from tools.restoration_tools import restore_artifact_image, identify_artifact_with_vision
+from adk_config import ADKConfig, configure_logging, get_model
+from adk_schemas import RestorationResult
+from tools.cache_tools import ResultCache, hash_file
+from tools.restoration_tools import (
+    VISION_MODEL, VISION_PROMPT_VERSION, restore_artifact_image, identify_artifact_with_vision
+)
+
+logger = logging.getLogger(__name__)
+
+
+_TYPE_LINE = re.compile(r'TYPE:\s*([^\n]+)', re.IGNORECASE)
+
+# Keyword -> artifact category, in priority order
+_TYPE_KEYWORDS = (
+    ("sculpt", "sculpture"), ("statue", "sculpture"),
+    ("monument", "monument"), ("architecture", "monument"),
+    ("paint", "painting"),
+    ("pottery", "pottery"), ("ceramic", "pottery"), ("vase", "pottery"),
+    ("relief", "sculpture"), ("carving", "sculpture"),
+    ("bronze", "sculpture"), ("metal", "sculpture"),
+    ("textile", "textile"), ("fabric", "textile")
+)
+
+# Looser full-text scan when no TYPE: line is present ("paint" also needs "canvas")
+_FALLBACK_KEYWORDS = (
+    ("sculpt", "sculpture"), ("statue", "sculpture"),
+    ("monument", "monument"),
+    ("paint", "painting"),
+    ("pottery", "pottery"), ("ceramic", "pottery")
+)
+
+# One pass over the text collects every keyword present
+_KEYWORD_PATTERN = re.compile("|".join(
+    re.escape(keyword) for keyword in dict.fromkeys([k for k, _ in _TYPE_KEYWORDS] + ["canvas"])
+))
+
+
+# Final analysis prompt; only the two placeholders change per artifact
+_ANALYSIS_PROMPT = string.Template("""You are an expert artifact conservator. You have this AI reconstruction description:
+
+$reconstruction_desc
+
+Also, identification details:
+$artifact_info
+
+Based on this information, provide a VIVID, COMPELLING description (150-200 words) formatted as:
+
+**HOW IT LOOKED WHEN CREATED**
+
+[Paint an extremely visual picture of the pristine, complete artifact - describe colors, missing parts reconstructed, surface finish, decorative details, overall magnificence]
+
+**WHAT'S DAMAGED NOW**
+
+[Quick bullet list of current damage]
+
+**AI RECONSTRUCTION DETAILS**
+
+[Specific reconstruction guidance from the AI - how missing parts should look based on symmetry, style, period]
+
+Be EXTREMELY descriptive and visual - help people imagine the original beauty!""")
 
 
 class RestorationAgent:
     """Gemini-based agent for artifact restoration with AI image generation"""
     
     def __init__(self):
-        # Configure API keys
-        api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-        genai.configure(api_key=api_key)
-        
-        # Use Gemini model directly
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-        
         self.system_prompt = """You are an expert artifact restoration specialist with deep knowledge of art history and conservation.
 
 Your responsibilities:
@@ -33,129 +86,210 @@ Your responsibilities:
 
 Always be thorough, scholarly, and provide specific details about the artifact."""
         
-        print("[OK] Restoration Agent initialized (Gemini + DALL-E)")
+        # System prompt is sent once as system_instruction instead of per request
+        self.model = get_model('gemini-2.0-flash', system_instruction=self.system_prompt)
+        
+        # Results keyed by image content for the RootAgent path (the web
+        # workflow caches in ADKOrchestrator instead)
+        self.result_cache: Optional[ResultCache] = (
+            ResultCache(ADKConfig.CACHE_DIR, ADKConfig.CACHE_MAX_ITEMS) if ADKConfig.RESULT_CACHE else None
+        )
+        
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] Restoration Agent initialized (Gemini + DALL-E)")
     
-    def analyze_and_restore(self, image_path: str) -> Dict[str, Any]:
+    def identify_and_restore(self, image_path: str) -> Dict[str, Any]:
         """
-        Analyze and restore artifact image using vision identification
+        Identify the artifact and restore its image (blocking vision, DALL-E and PIL work)
+        
+        Shared with FusedAnalysisAgent, which sends the returned prompt in
+        its combined request.
         
-        Args:
-            image_path: Path to artifact image
-            
         Returns:
-            Dictionary with analysis and restoration results
+            Intermediate state for the final analysis call, or an error dictionary
         """
+        # Step 1: Identify artifact using Vision API
+        logger.info("🔍 Identifying artifact with Vision API...")
+        image_key = hash_file(image_path)
+        image = Image.open(image_path)  # decoded once, shared with restoration
         try:
-            # Step 1: Identify artifact using Vision API
-            print("🔍 Identifying artifact with Vision API...")
-            identification = identify_artifact_with_vision(image_path)
+            identification = self._identify(image_path, image, image_key)
             
             artifact_info = identification.get('identification', '')
             artifact_type = "unknown"
             
             # Extract artifact type from identification - look for TYPE: line
-            import re
-            type_match = re.search(r'TYPE:\s*([^\n]+)', artifact_info, re.IGNORECASE)
+            type_match = _TYPE_LINE.search(artifact_info)
             if type_match:
                 type_text = type_match.group(1).strip().lower()
+                found = set(_KEYWORD_PATTERN.findall(type_text))
                 
-                # Map the identified type
-                if 'sculpt' in type_text or 'statue' in type_text:
-                    artifact_type = "sculpture"
-                elif 'monument' in type_text or 'architecture' in type_text:
-                    artifact_type = "monument"
-                elif 'paint' in type_text:
-                    artifact_type = "painting"
-                elif 'pottery' in type_text or 'ceramic' in type_text or 'vase' in type_text:
-                    artifact_type = "pottery"
-                elif 'relief' in type_text or 'carving' in type_text:
-                    artifact_type = "sculpture"
-                elif 'bronze' in type_text or 'metal' in type_text:
-                    artifact_type = "sculpture"
-                elif 'textile' in type_text or 'fabric' in type_text:
-                    artifact_type = "textile"
-                else:
-                    artifact_type = type_text.split()[0]  # Use first word
+                # Map the identified type (first keyword in priority order wins)
+                artifact_type = next(
+                    (category for keyword, category in _TYPE_KEYWORDS if keyword in found),
+                    type_text.split()[0] if type_text else artifact_type  # Use first word
+                )
             else:
                 # Fallback: search in full text
-                if 'sculpt' in artifact_info.lower() or 'statue' in artifact_info.lower():
-                    artifact_type = "sculpture"
-                elif 'monument' in artifact_info.lower():
-                    artifact_type = "monument"
-                elif 'paint' in artifact_info.lower() and 'canvas' in artifact_info.lower():
-                    artifact_type = "painting"
-                elif 'pottery' in artifact_info.lower() or 'ceramic' in artifact_info.lower():
-                    artifact_type = "pottery"
+                found = set(_KEYWORD_PATTERN.findall(artifact_info.lower()))
+                artifact_type = next(
+                    (category for keyword, category in _FALLBACK_KEYWORDS
+                     if keyword in found and (category != "painting" or "canvas" in found)),
+                    artifact_type
+                )
             
-            print(f"[OK] Identified as: {artifact_type}")
+            logger.info("[OK] Identified as: %s", artifact_type)
             
             # Step 2: Restore the image with type-specific techniques
-            print(f"🔧 Applying {artifact_type}-specific restoration...")
-            restoration_result = restore_artifact_image(image_path, "medium", artifact_type)
-            
-            if restoration_result.get("status") != "success":
-                return {
-                    "status": "error",
-                    "message": restoration_result.get("error_message", "Restoration failed")
-                }
-            
-            # Step 3: Generate vivid description AND show the reconstruction
-            reconstruction_desc = restoration_result.get("reconstruction_description", "")
-            generation_method = restoration_result.get("generation_method", "Enhancement")
+            logger.info("🔧 Applying %s-specific restoration...", artifact_type)
+            restoration_result = self._restore(image_path, image, image_key, artifact_type)
+        finally:
+            image.close()
+        
+        if restoration_result.get("status") != "success":
+            return {
+                "status": "error",
+                "message": restoration_result.get("error_message", "Restoration failed")
+            }
+        
+        # Step 3: Generate vivid description AND show the reconstruction
+        reconstruction_desc = restoration_result.get("reconstruction_description", "")
+        generation_method = restoration_result.get("generation_method", "Enhancement")
+        
+        prompt = _ANALYSIS_PROMPT.substitute(
+            reconstruction_desc=reconstruction_desc,
+            artifact_info=artifact_info
+        )
+        
+        return {
+            "status": "success",
+            "artifact_type": artifact_type,
+            "artifact_info": artifact_info,
+            "generation_method": generation_method,
+            "restoration_result": restoration_result,
+            "prompt": prompt
+        }
+    
+    def _identify(self, image_path: str, image: Image.Image, image_key: str) -> Dict[str, Any]:
+        """identify_artifact_with_vision, served from result_cache for repeat uploads"""
+        key = f"root_vision:{image_key}:{VISION_MODEL}:{VISION_PROMPT_VERSION}"
+        if self.result_cache is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                logger.info("↺ Identification served from cache")
+                return cached
+        
+        identification = identify_artifact_with_vision(image_path, preloaded_image=image)
+        if self.result_cache is not None and identification.get("status") == "success":
+            self.result_cache.set(key, identification)
+        return identification
+    
+    def _restore(self, image_path: str, image: Image.Image, image_key: str, artifact_type: str) -> Dict[str, Any]:
+        """restore_artifact_image, served from result_cache before any Gemini or DALL-E call
+        
+        A hit whose restored file the janitor has already expired is a miss.
+        """
+        key = f"root_restoration:{image_key}:medium:{artifact_type}"
+        if self.result_cache is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None and os.path.exists(cached.get("restored_image_path") or ""):
+                logger.info("↺ Restoration served from cache")
+                return cached
+        
+        restoration_result = restore_artifact_image(image_path, "medium", artifact_type,
+                                                    preloaded_image=image, image_key=image_key)
+        if self.result_cache is not None and restoration_result.get("status") == "success":
+            self.result_cache.set(key, restoration_result)
+        return restoration_result
+    
+    def build_result(self, prepared: Dict[str, Any], analysis_text: str, image_path: str) -> RestorationResult:
+        """Combine the final Gemini analysis with the restoration output (also used by FusedAnalysisAgent)"""
+        analysis_text = analysis_text or "Analysis unavailable"
+        generation_method = prepared["generation_method"]
+        restoration_result = prepared["restoration_result"]
+        
+        # Add note about image generation
+        if "AI Image Generation" in generation_method:
+            analysis_text = f"**NOTE: Generated pristine image using AI**\n\n{analysis_text}"
+        else:
+            analysis_text = f"**NOTE: Enhanced image shown. Full AI image generation available with DALL-E 3**\n\n{analysis_text}"
+        
+        return RestorationResult(
+            status="success",
+            restored_image_path=restoration_result.get("restored_image_path"),
+            restoration_level=restoration_result.get("restoration_level"),
+            artifact_type=prepared["artifact_type"],
+            artifact_identification=prepared["artifact_info"],
+            analysis=analysis_text,
+            image_path=image_path
+        )
+    
+    @staticmethod
+    def _error_result(e: Exception) -> RestorationResult:
+        logger.exception("Analysis failed")
+        return RestorationResult(status="error", message=f"Analysis failed: {str(e)}")
+    
+    def analyze_and_restore(self, image_path: str) -> RestorationResult:
+        """
+        Analyze and restore artifact image using vision identification
+        
+        Args:
+            image_path: Path to artifact image
             
-            prompt = f"""You are an expert artifact conservator. You have this AI reconstruction description:
-
-{reconstruction_desc}
-
-Also, identification details:
-{artifact_info}
-
-Based on this information, provide a VIVID, COMPELLING description (150-200 words) formatted as:
-
-**HOW IT LOOKED WHEN CREATED**
-
-[Paint an extremely visual picture of the pristine, complete artifact - describe colors, missing parts reconstructed, surface finish, decorative details, overall magnificence]
-
-**WHAT'S DAMAGED NOW**
-
-[Quick bullet list of current damage]
-
-**AI RECONSTRUCTION DETAILS**
-
-[Specific reconstruction guidance from the AI - how missing parts should look based on symmetry, style, period]
-
-Be EXTREMELY descriptive and visual - help people imagine the original beauty!"""
+        Returns:
+            RestorationResult with analysis and restoration results
+        """
+        try:
+            prepared = self.identify_and_restore(image_path)
+            if prepared["status"] != "success":
+                return RestorationResult(status="error", message=prepared["message"])
             
             # Use Gemini model for final analysis
-            full_prompt = f"{self.system_prompt}\n\n{prompt}"
-            response = self.model.generate_content(full_prompt)
-            analysis_text = response.text if response.text else "Analysis unavailable"
+            response = self.model.generate_content(prepared["prompt"])
+            return self.build_result(prepared, response.text, image_path)
             
-            # Add note about image generation
-            if "AI Image Generation" in generation_method:
-                analysis_text = f"**NOTE: Generated pristine image using AI**\n\n{analysis_text}"
-            else:
-                analysis_text = f"**NOTE: Enhanced image shown. Full AI image generation available with DALL-E 3**\n\n{analysis_text}"
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def analyze_and_restore_stream(self, image_path: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze and restore, streaming the final analysis as Gemini generates it
+        
+        Identification and image restoration run in a worker thread; the
+        final analysis uses the async Gemini client with stream=True.
+        
+        Args:
+            image_path: Path to artifact image
             
-            return {
-                "status": "success",
-                "restored_image_base64": restoration_result.get("restored_image_base64"),
-                "restoration_level": restoration_result.get("restoration_level"),
-                "artifact_type": artifact_type,
-                "artifact_identification": artifact_info,
-                "analysis": analysis_text,
-                "image_path": image_path
-            }
+        Yields:
+            {"event": "analysis_chunk", "text": ...} per response chunk, then
+            {"event": "result", "result": ...} with the analyze_and_restore result
+        """
+        try:
+            prepared = await asyncio.to_thread(self.identify_and_restore, image_path)
+            if prepared["status"] != "success":
+                yield {"event": "result", "result": RestorationResult(status="error", message=prepared["message"])}
+                return
+            
+            response = await self.model.generate_content_async(prepared["prompt"], stream=True)
+            parts = []
+            async for chunk in response:
+                parts.append(chunk.text)
+                yield {"event": "analysis_chunk", "text": chunk.text}
+            result = self.build_result(prepared, "".join(parts), image_path)
             
         except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return {
-                "status": "error",
-                "message": f"Analysis failed: {str(e)}"
-            }
-
+            result = self._error_result(e)
+        
+        yield {"event": "result", "result": result}
+    
+    async def analyze_and_restore_async(self, image_path: str) -> RestorationResult:
+        """Async variant of analyze_and_restore (collects analyze_and_restore_stream)"""
+        async for event in self.analyze_and_restore_stream(image_path):
+            if event["event"] == "result":
+                return event["result"]
 
 if __name__ == "__main__":
+    configure_logging()
     agent = RestorationAgent()
-    print("[OK] Restoration Agent ready for use")
+    logger.info("[OK] Restoration Agent ready for use")
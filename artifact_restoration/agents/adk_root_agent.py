@@ -1,35 +1,92 @@
 """
 Root Orchestrator Agent using Google ADK
 """
-from typing import Dict, Any
+import asyncio
+import functools
+import logging
+from typing import Callable, Dict, Any, List, Optional
+from adk_config import ADKConfig, configure_logging
 from .adk_restoration_agent import RestorationAgent
 from .adk_data_agent import DataFetcherAgent
 from .adk_environmental_agent import EnvironmentalAgent
+from .adk_fused_agent import FusedAnalysisAgent
+
+logger = logging.getLogger(__name__)
+
+_RULE = "=" * 60
 
 
 class RootAgent:
     """Main orchestrator for multi-agent workflow using Google ADK"""
     
     def __init__(self):
-        print("🚀 Initializing Root Agent with ADK components...")
+        # Sub-agents are created on first use, so callers that only need
+        # restoration never build the other pipeline stages
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] Root Agent initialized (sub-agents load on demand)")
+    
+    @functools.cached_property
+    def restoration_agent(self) -> RestorationAgent:
+        return RestorationAgent()
+    
+    @functools.cached_property
+    def data_agent(self) -> DataFetcherAgent:
+        return DataFetcherAgent()
+    
+    @functools.cached_property
+    def environmental_agent(self) -> EnvironmentalAgent:
+        return EnvironmentalAgent()
+    
+    @functools.cached_property
+    def fused_agent(self) -> FusedAnalysisAgent:
+        return FusedAnalysisAgent(
+            self.restoration_agent, self.data_agent, self.environmental_agent
+        )
+    
+    def process_artifact(self, image_path: str, time_span: int = 10) -> Dict[str, Any]:
+        """Synchronous entry point for process_artifact_async"""
+        return asyncio.run(self.process_artifact_async(image_path, time_span))
+    
+    def process_batch(self, image_paths: List[str], time_span: int = 10) -> List[Dict[str, Any]]:
+        """Synchronous entry point for process_batch_async"""
+        return asyncio.run(self.process_batch_async(image_paths, time_span))
+    
+    async def process_batch_async(self, image_paths: List[str], time_span: int = 10) -> List[Dict[str, Any]]:
+        """
+        Process many artifacts concurrently
+        
+        At most ADKConfig.MAX_CONCURRENT_REQUESTS workflows are in flight at
+        once to stay within Gemini rate limits.
+        
+        Args:
+            image_paths: Paths to artifact images
+            time_span: Years for environmental prediction
+            
+        Returns:
+            Results for each image, in input order
+        """
+        semaphore = asyncio.Semaphore(ADKConfig.MAX_CONCURRENT_REQUESTS)
         
-        # Initialize all sub-agents
-        self.restoration_agent = RestorationAgent()
-        self.data_agent = DataFetcherAgent()
-        self.environmental_agent = EnvironmentalAgent()
+        async def run(image_path: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.process_artifact_async(image_path, time_span)
         
-        print("[OK] Root Agent fully initialized with all sub-agents")
+        return await asyncio.gather(*(run(path) for path in image_paths))
     
-    def process_artifact(self, image_path: str, time_span: int = 10) -> Dict[str, Any]:
+    async def process_artifact_async(self, image_path: str, time_span: int = 10,
+                                     on_progress: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
         """
         Orchestrate complete multi-agent workflow
         
         Args:
             image_path: Path to artifact image
             time_span: Years for environmental prediction
+            on_progress: Called as on_progress(step, text) with restoration,
+                historical and environmental text chunks as they stream in
             
         Returns:
-            Complete analysis results from all agents
+            Complete analysis results from all agents (per-agent entries are
+            the adk_schemas result dataclasses; dataclasses.asdict for JSON)
         """
         results = {
             "image_path": image_path,
@@ -37,68 +94,90 @@ class RootAgent:
             "workflow_status": "initiated"
         }
         
-        print(f"\n{'='*60}")
-        print(f"🏛️  ARTIFACT RESTORATION WORKFLOW")
-        print(f"{'='*60}")
-        print(f"Image: {image_path}")
-        print(f"Prediction span: {time_span} years")
-        print(f"{'='*60}\n")
+        logger.info("\n%s\n🏛️  ARTIFACT RESTORATION WORKFLOW\n%s\nImage: %s\nPrediction span: %s years\n%s\n",
+                    _RULE, _RULE, image_path, time_span, _RULE)
+        
+        if ADKConfig.FUSED_ANALYSIS:
+            logger.info("🔧 Restoration + Historical + Environmental (single fused call)")
+            fused_result = await self.fused_agent.analyze_async(image_path, time_span)
+            if fused_result["status"] == "success":
+                results["restoration"] = fused_result["restoration"]
+                results["restored_image_path"] = fused_result["restoration"].restored_image_path
+                results["data_fetcher"] = fused_result["data_fetcher"]
+                results["environmental"] = fused_result["environmental"]
+                results["workflow_status"] = "completed"
+                logger.info("[OK] FUSED WORKFLOW COMPLETED SUCCESSFULLY\n")
+                return results
+            logger.warning("⚠ Fused analysis failed: %s\n→ Falling back to chained agents...\n",
+                           fused_result.get('message'))
         
         # Step 1: Restoration Agent
-        print("🔧 STEP 1: Restoration & Analysis")
-        restoration_result = self.restoration_agent.analyze_and_restore(image_path)
+        logger.info("🔧 STEP 1: Restoration & Analysis")
+        restoration_result = None
+        async for event in self.restoration_agent.analyze_and_restore_stream(image_path):
+            if event["event"] == "result":
+                restoration_result = event["result"]
+            elif on_progress:
+                on_progress("restoration", event["text"])
         results["restoration"] = restoration_result
         
-        if restoration_result.get("restored_image_base64"):
-            results["restored_image"] = restoration_result["restored_image_base64"]
+        if restoration_result.restored_image_path:
+            results["restored_image_path"] = restoration_result.restored_image_path
         
-        if restoration_result["status"] != "success":
+        if restoration_result.status != "success":
             results["workflow_status"] = "failed_at_restoration"
-            print(f"❌ Restoration failed: {restoration_result.get('message')}")
+            logger.error("❌ Restoration failed: %s", restoration_result.message)
             return results
         
-        print("[OK] Restoration complete")
-        
-        # Step 2: Data Fetcher Agent
-        print("\n📚 STEP 2: Historical Context Retrieval")
-        analysis_text = restoration_result.get("analysis", "")
-        artifact_identification = restoration_result.get("artifact_identification", "")
-        data_result = self.data_agent.fetch_context(analysis_text, artifact_identification)
+        logger.info("[OK] Restoration complete")
+        
+        # Steps 2-3: both only depend on the restoration analysis, so fan out
+        logger.info("\n📚 STEP 2 + 🌍 STEP 3: Historical Context & Environmental Analysis (%s years)", time_span)
+        analysis_text = restoration_result.analysis
+        artifact_identification = restoration_result.artifact_identification
+        data_result, environmental_result = await asyncio.gather(
+            self.data_agent.fetch_context_async(
+                analysis_text, artifact_identification,
+                on_chunk=on_progress and functools.partial(on_progress, "historical")
+            ),
+            self.environmental_agent.predict_degradation_timeline_async(
+                f"{artifact_identification}\n\n{analysis_text}",
+                time_span,
+                material="canvas",  # Default, could be extracted from analysis
+                on_chunk=on_progress and functools.partial(on_progress, "environmental")
+            )
+        )
         results["data_fetcher"] = data_result
+        results["environmental"] = environmental_result
         
-        if data_result["status"] != "success":
+        if data_result.status != "success":
             results["workflow_status"] = "failed_at_data_fetcher"
-            print(f"❌ Data fetching failed: {data_result.get('message')}")
+            logger.error("❌ Data fetching failed: %s", data_result.message)
             return results
         
-        print("[OK] Historical context retrieved")
+        logger.info("[OK] Historical context retrieved")
         
-        # Step 3: Environmental Agent
-        print(f"\n🌍 STEP 3: Environmental Degradation Analysis ({time_span} years)")
-        historical_context = data_result.get("historical_context", "")
-        environmental_result = self.environmental_agent.predict_degradation_timeline(
-            historical_context, 
-            time_span,
-            material="canvas"  # Default, could be extracted from analysis
-        )
-        results["environmental"] = environmental_result
-        
-        if environmental_result["status"] != "success":
+        if environmental_result.status != "success":
             results["workflow_status"] = "failed_at_environmental"
-            print(f"❌ Environmental analysis failed: {environmental_result.get('message')}")
+            logger.error("❌ Environmental analysis failed: %s", environmental_result.message)
             return results
         
-        print("[OK] Environmental analysis complete")
+        logger.info("[OK] Environmental analysis complete")
         
         # Workflow complete
         results["workflow_status"] = "completed"
-        print(f"\n{'='*60}")
-        print("[OK] MULTI-AGENT WORKFLOW COMPLETED SUCCESSFULLY")
-        print(f"{'='*60}\n")
+        logger.info("\n%s\n[OK] MULTI-AGENT WORKFLOW COMPLETED SUCCESSFULLY\n%s\n", _RULE, _RULE)
         
         return results
 
 
+@functools.lru_cache(maxsize=1)
+def get_root_agent() -> RootAgent:
+    """Process-wide RootAgent so servers initialize sub-agents once"""
+    return RootAgent()
+
+
 if __name__ == "__main__":
-    root = RootAgent()
-    print("[OK] Root Agent ready for artifact processing")
+    configure_logging()
+    root = get_root_agent()
+    logger.info("[OK] Root Agent ready for artifact processing")
@@ -2,33 +2,27 @@
 Sequential ADK Agents with proper handoffs and context engineering
 """
 import google.adk as adk
-import google.generativeai as genai
+from PIL import Image
 from typing import Dict, Any, Optional
-import os
-import sys
+import json
+import logging
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from adk_config import ADKConfig, ContextManager, MCPTools
+from adk_config import ADKConfig, ContextManager, MCPTools, configure_genai, get_model
+from adk_schemas import ArtifactReport
+from tools.cache_tools import get_semantic_cache
 from tools.restoration_tools import (
+    fit_for_gemini,
     identify_artifact_with_vision,
     restore_artifact_image,
-    predict_degradation
+    predict_degradation,
+    thaw_degradation
 )
 
+logger = logging.getLogger(__name__)
 
-class VisionAnalysisAgent:
-    """ADK Agent for visual analysis using Gemini Vision"""
-    
-    def __init__(self, context_manager: ContextManager):
-        self.context_manager = context_manager
-        genai.configure(api_key=ADKConfig.get_api_key())
-        
-        # Create ADK Agent with vision capabilities
-        self.agent = adk.Agent(
-            name=ADKConfig.AGENT_NAMES["vision"],
-            model=ADKConfig.MODEL_NAME,
-            instruction="""You are an expert computer vision system specializing in artifact analysis.
+
+# Agent instructions (shared with the fused single-call report)
+VISION_INSTRUCTION = """You are an expert computer vision system specializing in artifact analysis.
 
 Your capabilities:
 1. Identify artifact type (painting, sculpture, monument, textile, pottery, etc.)
@@ -55,44 +49,168 @@ MISSING_PARTS: [list of missing/broken parts]
 DESCRIPTION: [detailed visual description]
 
 Be scholarly, precise, and thorough."""
+
+RESTORATION_INSTRUCTION = """You are an expert artifact conservator and restoration specialist.
+
+Your role:
+1. Analyze damage assessment from vision analysis
+2. Design restoration strategy for the specific artifact type
+3. Generate detailed prompts for AI image generation
+4. Ensure historical and cultural accuracy
+
+For each artifact:
+- Understand the original pristine state based on type and period
+- Account for all missing/damaged parts
+- Consider authentic materials, colors, and techniques
+- Describe the PERFECT, COMPLETE version in extreme detail
+
+Your restoration prompts should:
+- Start with artifact type and period
+- Describe perfect condition with ALL parts intact
+- Include authentic colors, textures, and details
+- Mention lighting and viewing angle
+- Be specific about what was broken/missing is now restored
+- Avoid any signs of damage or aging
+
+Output a detailed restoration prompt that will create a museum-quality pristine version."""
+
+HISTORICAL_INSTRUCTION = """You are an expert art historian and archaeologist with comprehensive knowledge of global artifacts.
+
+Your expertise includes:
+- Art history across all periods and cultures
+- Archaeological findings and museum collections
+- Conservation and provenance research
+- Material culture and artistic techniques
+
+When provided with artifact analysis:
+1. Identify the specific artifact if recognizable
+2. Provide historical period and cultural context
+3. Describe the original creation and purpose
+4. List similar artifacts in major museums
+5. Explain historical significance
+6. Note conservation challenges for this type
+
+Be scholarly, cite specific examples, and provide educational context.
+If the artifact is famous, name it and its current museum location.
+Always relate findings to the visual analysis provided."""
+
+ENVIRONMENTAL_INSTRUCTION = """You are an expert in conservation science, materials degradation, and environmental analysis.
+
+Your expertise:
+- Material science and degradation mechanisms
+- Environmental factors (temperature, humidity, light, pollution)
+- Climate patterns and their effects on artifacts
+- Preventive conservation strategies
+- Long-term preservation planning
+
+When predicting degradation:
+1. Analyze the artifact's materials and current condition
+2. Determine likely storage location based on historical context
+3. Assess environmental risks for that location
+4. Calculate degradation rates for specific materials
+5. Provide year-by-year predictions
+6. Recommend conservation interventions
+
+Output detailed predictions with:
+- Percentage degradation per year
+- Cumulative degradation over time
+- Specific risks (UV damage, humidity, pollution, etc.)
+- Recommended environmental controls
+- Critical intervention points
+
+Be scientific, precise, and provide actionable conservation guidance."""
+
+FUSED_INSTRUCTION = "\n\n".join([
+    "You perform the work of four cooperating specialists in a single pass and "
+    "return one JSON report with a section for each role.",
+    "=== VISION ANALYSIS ===\n" + VISION_INSTRUCTION,
+    "=== RESTORATION ===\n" + RESTORATION_INSTRUCTION,
+    "=== HISTORICAL CONTEXT ===\n" + HISTORICAL_INSTRUCTION,
+    "=== ENVIRONMENTAL PREDICTION ===\n" + ENVIRONMENTAL_INSTRUCTION
+])
+
+
+# Vision fields that describe the artifact itself, embedded for semantic lookup
+_DESCRIPTION_KEYS = ("artifact_name", "type", "period", "origin", "condition", "description")
+
+
+def _artifact_description(vision_output: Dict[str, Any]) -> str:
+    """Short free-text description of the artifact (fits the embedding model's window)"""
+    return "\n".join(f"{key}: {vision_output[key]}" for key in _DESCRIPTION_KEYS if vision_output.get(key))
+
+
+def _run_agent(runner, agent_name: str, prompt: str, description: str, *params) -> str:
+    """Run an ADK runner, reusing the response for a semantically equivalent artifact
+    
+    Args:
+        runner: ADK runner for the agent
+        agent_name: Agent key, part of the exact-match namespace
+        prompt: Full prompt sent to the model
+        description: Artifact description compared by embedding similarity
+        params: Request parameters that must match exactly (e.g. years, material)
+    """
+    cache = None
+    if ADKConfig.SEMANTIC_CACHE:
+        cache = get_semantic_cache(ADKConfig.SEMANTIC_CACHE_MODEL, ADKConfig.SEMANTIC_CACHE_THRESHOLD)
+    
+    if cache is None:
+        result = runner.run(prompt)
+        return result.content if hasattr(result, 'content') else str(result)
+    
+    namespace = "|".join([agent_name, ADKConfig.MODEL_NAME, *map(str, params)])
+    embedding = cache.embed(description)
+    cached = cache.get(namespace, embedding)
+    if cached is not None:
+        return cached
+    
+    result = runner.run(prompt)
+    text = result.content if hasattr(result, 'content') else str(result)
+    cache.add(namespace, embedding, text)
+    return text
+
+
+class VisionAnalysisAgent:
+    """ADK Agent for visual analysis using Gemini Vision"""
+    
+    def __init__(self):
+        configure_genai()
+        
+        # Create ADK Agent with vision capabilities
+        self.agent = adk.Agent(
+            name=ADKConfig.AGENT_NAMES["vision"],
+            model=ADKConfig.MODEL_NAME,
+            instruction=VISION_INSTRUCTION
         )
         
         # Use vision-capable model directly for image analysis
-        self.vision_model = genai.GenerativeModel(
-            model_name=ADKConfig.FALLBACK_MODEL,
-            generation_config={"temperature": ADKConfig.TEMPERATURES["vision_analysis"]}
-        )
+        self.vision_model = get_model(ADKConfig.FALLBACK_MODEL, ADKConfig.TEMPERATURES["vision_analysis"])
         
-        print(f"[OK] {ADKConfig.AGENT_NAMES['vision']} initialized")
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] %s initialized", ADKConfig.AGENT_NAMES['vision'])
     
-    def analyze(self, image_path: str) -> Dict[str, Any]:
-        """Analyze artifact image with vision AI"""
+    def analyze(self, context_manager: ContextManager, image_path: str,
+                preloaded_image: Optional[Image.Image] = None) -> Dict[str, Any]:
+        """Analyze artifact image with vision AI, storing the handoff in context_manager"""
         try:
-            # Use vision tool for identification
-            identification = identify_artifact_with_vision(image_path)
+            # Use vision tool for identification (JSON matching ArtifactIdentification)
+            vision = identify_artifact_with_vision(image_path, structured=True,
+                                                   preloaded_image=preloaded_image)
+            if vision.get("status") != "success":
+                raise RuntimeError(vision.get("error_message", "Vision identification failed"))
+            identification = vision["identification"]
             
-            # Store in context
-            self.context_manager.set_artifact_context("image_path", image_path)
-            self.context_manager.set_artifact_context("identification", identification)
-            
-            # Parse structured output
             result = {
                 "status": "success",
                 "identification": identification,
                 "raw_analysis": identification
             }
-            
-            # Extract structured fields
-            for line in identification.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower().replace(' ', '_')
-                    result[key] = value.strip()
+            result.update(vision["fields"])
             
             # Store output for next agent
-            self.context_manager.store_agent_output("vision", result)
+            self.store_result(context_manager, image_path, result)
             
-            print(f"[OK] Vision analysis complete: {result.get('type', 'Unknown type')}")
+            if ADKConfig.VERBOSE:
+                logger.info("[OK] Vision analysis complete: %s", result.get('type', 'Unknown type'))
             return result
             
         except Exception as e:
@@ -100,82 +218,72 @@ Be scholarly, precise, and thorough."""
                 "status": "error",
                 "message": str(e)
             }
-            self.context_manager.store_agent_output("vision", error_result)
+            context_manager.store_agent_output("vision", artifacts=error_result)
             return error_result
+    
+    @staticmethod
+    def store_result(context_manager: ContextManager, image_path: str, result: Dict[str, Any]):
+        """Hand a successful analysis (fresh or cached) to the later agents"""
+        context_manager.set_artifact_context("image_path", image_path)
+        context_manager.set_artifact_context("identification", result["identification"])
+        context_manager.store_agent_output("vision", artifacts=result)
 
 
 class RestorationGenerationAgent:
     """ADK Agent for generating pristine artifact reconstructions"""
     
-    def __init__(self, context_manager: ContextManager):
-        self.context_manager = context_manager
-        genai.configure(api_key=ADKConfig.get_api_key())
+    def __init__(self):
+        configure_genai()
         
         self.agent = adk.Agent(
             name=ADKConfig.AGENT_NAMES["restoration"],
             model=ADKConfig.MODEL_NAME,
-            instruction="""You are an expert artifact conservator and restoration specialist.
-
-Your role:
-1. Analyze damage assessment from vision analysis
-2. Design restoration strategy for the specific artifact type
-3. Generate detailed prompts for AI image generation
-4. Ensure historical and cultural accuracy
-
-For each artifact:
-- Understand the original pristine state based on type and period
-- Account for all missing/damaged parts
-- Consider authentic materials, colors, and techniques
-- Describe the PERFECT, COMPLETE version in extreme detail
-
-Your restoration prompts should:
-- Start with artifact type and period
-- Describe perfect condition with ALL parts intact
-- Include authentic colors, textures, and details
-- Mention lighting and viewing angle
-- Be specific about what was broken/missing is now restored
-- Avoid any signs of damage or aging
-
-Output a detailed restoration prompt that will create a museum-quality pristine version."""
+            instruction=RESTORATION_INSTRUCTION
         )
         
-        print(f"[OK] {ADKConfig.AGENT_NAMES['restoration']} initialized")
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] %s initialized", ADKConfig.AGENT_NAMES['restoration'])
     
-    def generate_restoration(self, restoration_level: str = "medium") -> Dict[str, Any]:
-        """Generate pristine restoration using DALL-E 3"""
+    def generate_restoration(self, context_manager: ContextManager, restoration_level: str = "medium",
+                             preloaded_image: Optional[Image.Image] = None,
+                             image_key: Optional[str] = None) -> Dict[str, Any]:
+        """Generate pristine restoration using DALL-E 3 from the request's vision handoff"""
         try:
             # Get vision analysis from context
-            vision_output = self.context_manager.get_agent_output("vision")
+            vision_output = context_manager.get_agent_output("vision")
             if not vision_output or vision_output.get("status") != "success":
                 return {
                     "status": "error",
                     "message": "Vision analysis required before restoration"
                 }
             
-            image_path = self.context_manager.get_artifact_context("image_path")
+            image_path = context_manager.get_artifact_context("image_path")
             artifact_type = vision_output.get("type", "artifact")
             
             # Build context-aware prompt
-            context_prompt = self.context_manager.build_context_prompt("restoration")
+            context_prompt = context_manager.build_context_prompt("restoration")
             
             # Use restoration tool (includes DALL-E 3)
             restoration_result = restore_artifact_image(
                 image_path,
                 restoration_level,
-                artifact_type
+                artifact_type,
+                preloaded_image=preloaded_image,
+                image_key=image_key
             )
             
             result = {
                 "status": "success",
-                "restored_image_base64": restoration_result.get("restored_image"),
-                "restoration_method": restoration_result.get("method", "AI Generation"),
+                "restored_image_path": restoration_result.get("restored_image_path"),
+                "restoration_method": restoration_result.get("generation_method", "AI Generation"),
                 "context_used": context_prompt[:500] + "..." if len(context_prompt) > 500 else context_prompt
             }
             
             # Store output
-            self.context_manager.store_agent_output("restoration", result)
+            context_manager.store_agent_output("restoration", artifacts=result)
             
-            print(f"[OK] Restoration generated using {result['restoration_method']}")
+            if ADKConfig.VERBOSE:
+                logger.info("[OK] Restoration generated using %s", result['restoration_method'])
             return result
             
         except Exception as e:
@@ -183,39 +291,20 @@ Output a detailed restoration prompt that will create a museum-quality pristine
                 "status": "error",
                 "message": str(e)
             }
-            self.context_manager.store_agent_output("restoration", error_result)
+            context_manager.store_agent_output("restoration", artifacts=error_result)
             return error_result
 
 
 class HistoricalContextAgent:
     """ADK Agent for retrieving historical context"""
     
-    def __init__(self, context_manager: ContextManager):
-        self.context_manager = context_manager
-        genai.configure(api_key=ADKConfig.get_api_key())
+    def __init__(self):
+        configure_genai()
         
         self.agent = adk.Agent(
             name=ADKConfig.AGENT_NAMES["historical"],
             model=ADKConfig.MODEL_NAME,
-            instruction="""You are an expert art historian and archaeologist with comprehensive knowledge of global artifacts.
-
-Your expertise includes:
-- Art history across all periods and cultures
-- Archaeological findings and museum collections
-- Conservation and provenance research
-- Material culture and artistic techniques
-
-When provided with artifact analysis:
-1. Identify the specific artifact if recognizable
-2. Provide historical period and cultural context
-3. Describe the original creation and purpose
-4. List similar artifacts in major museums
-5. Explain historical significance
-6. Note conservation challenges for this type
-
-Be scholarly, cite specific examples, and provide educational context.
-If the artifact is famous, name it and its current museum location.
-Always relate findings to the visual analysis provided."""
+            instruction=HISTORICAL_INSTRUCTION
         )
         
         # Create runner for this agent
@@ -226,14 +315,15 @@ Always relate findings to the visual analysis provided."""
             session_service=session_service
         )
         
-        print(f"[OK] {ADKConfig.AGENT_NAMES['historical']} initialized")
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] %s initialized", ADKConfig.AGENT_NAMES['historical'])
     
-    def fetch_context(self) -> Dict[str, Any]:
-        """Fetch historical context using previous agent outputs"""
+    def fetch_context(self, context_manager: ContextManager) -> Dict[str, Any]:
+        """Fetch historical context using the request's previous agent outputs"""
         try:
             # Get all previous context
-            vision_output = self.context_manager.get_agent_output("vision")
-            restoration_output = self.context_manager.get_agent_output("restoration")
+            vision_output = context_manager.get_agent_output("vision")
+            restoration_output = context_manager.get_agent_output("restoration")
             
             if not vision_output:
                 return {
@@ -242,7 +332,7 @@ Always relate findings to the visual analysis provided."""
                 }
             
             # Build rich context prompt
-            context = self.context_manager.build_context_prompt("historical")
+            context = context_manager.build_context_prompt("historical")
             
             prompt = f"""{context}
 
@@ -258,8 +348,8 @@ Based on the vision analysis above, provide comprehensive historical context:
 Be specific, scholarly, and educational. Connect the visual details to historical facts."""
             
             # Run agent
-            result = self.runner.run(prompt)
-            historical_text = result.content if hasattr(result, 'content') else str(result)
+            historical_text = _run_agent(self.runner, "historical", prompt,
+                                         _artifact_description(vision_output))
             
             output = {
                 "status": "success",
@@ -268,9 +358,10 @@ Be specific, scholarly, and educational. Connect the visual details to historica
             }
             
             # Store output
-            self.context_manager.store_agent_output("historical", output)
+            context_manager.store_agent_output("historical", artifacts=output)
             
-            print("[OK] Historical context retrieved")
+            if ADKConfig.VERBOSE:
+                logger.info("[OK] Historical context retrieved")
             return output
             
         except Exception as e:
@@ -278,45 +369,20 @@ Be specific, scholarly, and educational. Connect the visual details to historica
                 "status": "error",
                 "message": str(e)
             }
-            self.context_manager.store_agent_output("historical", error_result)
+            context_manager.store_agent_output("historical", artifacts=error_result)
             return error_result
 
 
 class EnvironmentalPredictionAgent:
     """ADK Agent for environmental degradation prediction"""
     
-    def __init__(self, context_manager: ContextManager):
-        self.context_manager = context_manager
-        genai.configure(api_key=ADKConfig.get_api_key())
+    def __init__(self):
+        configure_genai()
         
         self.agent = adk.Agent(
             name=ADKConfig.AGENT_NAMES["environmental"],
             model=ADKConfig.MODEL_NAME,
-            instruction="""You are an expert in conservation science, materials degradation, and environmental analysis.
-
-Your expertise:
-- Material science and degradation mechanisms
-- Environmental factors (temperature, humidity, light, pollution)
-- Climate patterns and their effects on artifacts
-- Preventive conservation strategies
-- Long-term preservation planning
-
-When predicting degradation:
-1. Analyze the artifact's materials and current condition
-2. Determine likely storage location based on historical context
-3. Assess environmental risks for that location
-4. Calculate degradation rates for specific materials
-5. Provide year-by-year predictions
-6. Recommend conservation interventions
-
-Output detailed predictions with:
-- Percentage degradation per year
-- Cumulative degradation over time
-- Specific risks (UV damage, humidity, pollution, etc.)
-- Recommended environmental controls
-- Critical intervention points
-
-Be scientific, precise, and provide actionable conservation guidance."""
+            instruction=ENVIRONMENTAL_INSTRUCTION
         )
         
         # Create runner
@@ -327,30 +393,37 @@ Be scientific, precise, and provide actionable conservation guidance."""
             session_service=session_service
         )
         
-        print(f"[OK] {ADKConfig.AGENT_NAMES['environmental']} initialized")
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] %s initialized", ADKConfig.AGENT_NAMES['environmental'])
     
-    def predict_degradation(self, years: int = 10) -> Dict[str, Any]:
-        """Predict environmental degradation timeline"""
+    def predict_degradation(self, context_manager: ContextManager, years: int = 10,
+                            vision_output: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Predict environmental degradation timeline
+        
+        Args:
+            context_manager: Context of the current request
+            years: Years to predict
+            vision_output: Vision analysis to predict from (defaults to the stored handoff)
+        """
         try:
-            # Get all context from previous agents
-            vision_output = self.context_manager.get_agent_output("vision")
-            historical_output = self.context_manager.get_agent_output("historical")
+            # Only vision output is required; historical context is used if already available
+            vision_output = vision_output or context_manager.get_agent_output("vision")
             
-            if not vision_output or not historical_output:
+            if not vision_output:
                 return {
                     "status": "error",
-                    "message": "Vision and historical analysis required"
+                    "message": "Vision analysis required"
                 }
             
             # Build context
-            context = self.context_manager.build_context_prompt("environmental")
+            context = context_manager.build_context_prompt("environmental")
             
-            material = vision_output.get("materials", "unknown")
+            material = vision_output.get("material", "unknown")
             current_condition = vision_output.get("condition", "unknown")
             
             prompt = f"""{context}
 
-Based on the artifact analysis and historical context above:
+Based on the artifact analysis (and any historical context) above:
 
 PREDICTION TASK:
 - Time span: {years} years
@@ -372,11 +445,11 @@ Provide:
 Provide numerical predictions and scientific reasoning."""
             
             # Run agent
-            result = self.runner.run(prompt)
-            prediction_text = result.content if hasattr(result, 'content') else str(result)
+            prediction_text = _run_agent(self.runner, "environmental", prompt,
+                                         _artifact_description(vision_output), years, material)
             
             # Also use degradation tool for chart data
-            degradation_data = predict_degradation(material, years)
+            degradation_data = thaw_degradation(predict_degradation(material, years))
             
             output = {
                 "status": "success",
@@ -387,9 +460,10 @@ Provide numerical predictions and scientific reasoning."""
             }
             
             # Store output
-            self.context_manager.store_agent_output("environmental", output)
+            context_manager.store_agent_output("environmental", artifacts=output)
             
-            print(f"[OK] Environmental predictions for {years} years complete")
+            if ADKConfig.VERBOSE:
+                logger.info("[OK] Environmental predictions for %d years complete", years)
             return output
             
         except Exception as e:
@@ -397,5 +471,102 @@ Provide numerical predictions and scientific reasoning."""
                 "status": "error",
                 "message": str(e)
             }
-            self.context_manager.store_agent_output("environmental", error_result)
+            context_manager.store_agent_output("environmental", artifacts=error_result)
             return error_result
+
+
+class FusedReportAgent:
+    """Single structured Gemini call covering vision, restoration, historical and environmental sections"""
+    
+    def __init__(self):
+        # One multimodal call returns every section as JSON matching ArtifactReport
+        self.model = get_model(
+            ADKConfig.FALLBACK_MODEL,
+            temperature=ADKConfig.TEMPERATURES["fused_report"],
+            system_instruction=FUSED_INSTRUCTION,
+            response_schema=ArtifactReport
+        )
+        
+        if ADKConfig.VERBOSE:
+            logger.info("[OK] %s initialized", ADKConfig.AGENT_NAMES['fused'])
+    
+    def generate_report(self, context_manager: ContextManager, image_path: str,
+                        restoration_level: str = "medium", time_span: int = 10,
+                        image_key: Optional[str] = None) -> Dict[str, Any]:
+        """Produce all agent sections with one Gemini request"""
+        try:
+            prompt = f"""Analyze this artifact image and fill in every section of the report:
+
+- vision_analysis: identification in the vision output format
+- artifact_type, material, condition: short values taken from the vision analysis
+- restoration: detailed description of the complete, pristine artifact for image generation
+- historical_context: identification, period, significance, similar artifacts, conservation notes
+- environmental_predictions: location assessment, risks and a degradation timeline over {time_span} years"""
+            
+            # Decoded once for both the report call and restoration
+            with Image.open(image_path) as image:
+                response = self.model.generate_content([prompt, fit_for_gemini(image)])
+                report = json.loads(response.text)
+                
+                # Image generation still needs its own call; reuse the fused description for it
+                restoration_result = restore_artifact_image(
+                    image_path,
+                    restoration_level,
+                    report["artifact_type"],
+                    reconstruction_description=report["restoration"],
+                    preloaded_image=image,
+                    image_key=image_key
+                )
+            degradation_data = thaw_degradation(predict_degradation(report["material"], time_span))
+            
+            output = {
+                "status": "success",
+                "vision_analysis": {
+                    "status": "success",
+                    "identification": report["vision_analysis"],
+                    "type": report["artifact_type"],
+                    "material": report["material"],
+                    "condition": report["condition"]
+                },
+                "restoration": {
+                    "status": restoration_result.get("status", "error"),
+                    "message": restoration_result.get("error_message", ""),
+                    "restored_image_path": restoration_result.get("restored_image_path"),
+                    "restoration_method": restoration_result.get("generation_method", "AI Generation")
+                },
+                "historical_context": {
+                    "status": "success",
+                    "historical_context": report["historical_context"],
+                    "sources": "Gemini structured report"
+                },
+                "environmental_prediction": {
+                    "status": "success",
+                    "predictions": report["environmental_predictions"],
+                    "degradation_timeline": degradation_data.get("timeline", []),
+                    "chart_data": degradation_data,
+                    "years_analyzed": time_span
+                }
+            }
+            
+            self.store_report(context_manager, image_path, output)
+            
+            if ADKConfig.VERBOSE:
+                logger.info("[OK] Fused report generated: %s", report['artifact_type'])
+            return output
+            
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+    
+    @staticmethod
+    def store_report(context_manager: ContextManager, image_path: str, report: Dict[str, Any]):
+        """Store each section of a report (fresh or cached) as its agent's output"""
+        context_manager.set_artifact_context("image_path", image_path)
+        context_manager.set_artifact_context("identification", report["vision_analysis"]["identification"])
+        for agent_name, section in (("vision", "vision_analysis"),
+                                    ("restoration", "restoration"),
+                                    ("historical", "historical_context"),
+                                    ("environmental", "environmental_prediction")):
+            context_manager.store_agent_output(agent_name, artifacts=report[section])
@@ -3,31 +3,177 @@ Flask Application for Artifact Restoration Multi-Agent System
 Using Google ADK (Agent Development Kit) with Sequential Agents, MCP, and Context Engineering
 """
 
-from flask import Flask, render_template, request, jsonify, make_response
+from flask import Flask, render_template, request, jsonify, make_response, send_from_directory, url_for
+from flask.json.provider import DefaultJSONProvider, JSONProvider
 from flask_cors import CORS
-import traceback
+import functools
 import os
-import base64
-from werkzeug.utils import secure_filename
+import uuid
+from collections.abc import Mapping
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Import setup first to ensure authentication
 from setup_adk import GEMINI_API_KEY
 
-# Import new ADK Orchestrator with sequential agents
-from adk_orchestrator import ADKOrchestrator
+# The ADK Orchestrator (sequential agents) is built by jobs.run_pipeline on first use
+from adk_config import ADKConfig, configure_logging
+from jobs import b64encode, discard_upload, get_job_queue, run_pipeline, start_upload_janitor
+from tools.restoration_tools import RESTORED_DIR
+
+
+def _json_default(obj):
+    """Serialize read-only mappings, then defer to Flask's default handling"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (large base64 payloads serialize much faster)"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_json_default).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the str copy
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_json_default), mimetype='application/json'
+        )
+
 
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['UPLOAD_FOLDER'] = ADKConfig.UPLOAD_DIR  # shared with RQ workers
+app.config['ALLOWED_EXTENSIONS'] = frozenset({'.jpg', '.jpeg', '.png', '.webp'})
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching
 
-# Create upload folder if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Initialize ADK Orchestrator with sequential agents, MCP, and context engineering
-orchestrator = ADKOrchestrator()
-print("[OK] Application ready with ADK Sequential Agents!")
+@functools.lru_cache(maxsize=1)
+def _upload_folder():
+    """Create the upload folder and start its janitor on the first upload
+    
+    Kept off the import path, like orchestrator construction, so workers
+    that only serve pages or /health start without either.
+    """
+    folder = app.config['UPLOAD_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    start_upload_janitor(folder)
+    return folder
+
+
+# ~768 KB; a multiple of 3 so per-chunk base64 strings concatenate without padding
+_UPLOAD_CHUNK_SIZE = 3 * (1 << 18)
+
+
+def _save_upload(file, filepath):
+    """Stream an upload to disk and return its base64 encoding in the same pass"""
+    encoded = []
+    with open(filepath, 'xb') as out:
+        for chunk in iter(lambda: file.stream.read(_UPLOAD_CHUNK_SIZE), b''):
+            out.write(chunk)
+            encoded.append(b64encode(chunk))
+    return ''.join(encoded)
+
+
+def _restored_image_url(path):
+    """URL of a restored image under /restored_image (agents pass images by path)"""
+    if not path:
+        return None
+    return url_for('restored_image', filename=os.path.basename(path))
+
+
+# Labels for structured vision fields, in the vision prompt's text order
+_IDENTIFICATION_LABELS = (
+    ('artifact_name', 'ARTIFACT NAME'),
+    ('type', 'TYPE'),
+    ('material', 'MATERIAL'),
+    ('period', 'PERIOD'),
+    ('origin', 'ORIGIN'),
+    ('location', 'LOCATION'),
+    ('condition', 'CONDITION'),
+    ('damage', 'DAMAGE'),
+    ('missing_parts', 'MISSING PARTS'),
+    ('description', 'DESCRIPTION'),
+    ('confidence', 'CONFIDENCE'),
+)
+
+
+def _format_identification(vision_data):
+    """Labelled text for the dashboard (structured output would otherwise show as raw JSON)"""
+    if 'artifact_name' not in vision_data:
+        # Fused reports already carry the identification as text
+        return vision_data.get('identification', '')
+    lines = []
+    for key, label in _IDENTIFICATION_LABELS:
+        value = vision_data.get(key)
+        if isinstance(value, list):
+            value = ', '.join(value) or 'None'
+        if value:
+            lines.append(f"{label}: {value}")
+    return '\n\n'.join(lines)
+
+
+def _build_response(payload, restoration_level, time_span):
+    """Format run_pipeline output to match frontend expectations"""
+    results = payload['results']
+    original_image_file = payload.get('original_image_file')
+    
+    # Extract results from sequential agent outputs
+    vision_data = results.get('vision_analysis', {})
+    restoration_data = results.get('restoration', {})
+    historical_data = results.get('historical_context', {})
+    environmental_data = results.get('environmental_prediction', {})
+    
+    return {
+        'success': results.get('workflow_status') == 'completed',
+        'results': {
+            'workflow_status': results.get('workflow_status'),
+            'agents_executed': results.get('agents_executed', []),
+            'context_summary': results.get('context_summary', {}),
+            'original_image': payload.get('original_image'),
+            'original_image_url': original_image_file and url_for('restored_image', filename=original_image_file),
+            'restored_image_url': _restored_image_url(results.get('restored_image_path')),
+            'time_span': time_span,
+            'restoration': {
+                'status': restoration_data.get('status', 'error'),
+                'message': 'AI-generated pristine restoration completed' if restoration_data.get('status') == 'success' else 'Restoration failed',
+                'response': _format_identification(vision_data),
+                'restoration_details': f"Method: {restoration_data.get('restoration_method', 'N/A')} | Level: {restoration_level}",
+                'artifact_type': vision_data.get('type', 'Unknown'),
+                'condition': vision_data.get('condition', 'Unknown')
+            },
+            'data_fetcher': {
+                'status': historical_data.get('status', 'error'),
+                'message': 'Historical context retrieved via ADK' if historical_data.get('status') == 'success' else historical_data.get('message') if historical_data.get('status') == 'skipped' else 'Historical retrieval failed',
+                'historical_data': historical_data.get('historical_context', '')
+            },
+            'environmental': {
+                'status': environmental_data.get('status', 'error'),
+                'message': f'Environmental predictions for {time_span} years via ADK' if environmental_data.get('status') == 'success' else environmental_data.get('message') if environmental_data.get('status') == 'skipped' else 'Environmental prediction failed',
+                'time_span': time_span,
+                'environmental_analysis': environmental_data.get('predictions', '')
+            },
+            'degradation_predictions': environmental_data.get('degradation_timeline', [])
+        }
+    }
+
+
+@app.before_request
+def _configure_logging():
+    """Start the log listener (and create the log folder) in the serving process, not at import"""
+    configure_logging(log_file=ADKConfig.LOG_FILE)
 
 
 @app.route('/')
@@ -65,79 +211,86 @@ def process_artifact():
                 'error': 'No file selected'
             }), 400
         
-        # Save the uploaded file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        ext = os.path.splitext(file.filename)[1].lower()
+        if ext not in app.config['ALLOWED_EXTENSIONS']:
+            return jsonify({
+                'success': False,
+                'error': f"Unsupported file type '{ext or file.filename}'. Allowed: "
+                         + ', '.join(sorted(app.config['ALLOWED_EXTENSIONS']))
+            }), 400
         
-        # Read image and convert to base64
-        with open(filepath, 'rb') as f:
-            image_data = f.read()
-            original_image_b64 = base64.b64encode(image_data).decode('utf-8')
+        # Save the uploaded file under a unique name (concurrent uploads of
+        # the same filename must not overwrite each other)
+        filepath = os.path.join(_upload_folder(), f"{uuid.uuid4().hex}{ext}")
         
         time_span = int(request.form.get('time_span', 10))
         restoration_level = request.form.get('restoration_level', 'medium')
         
-        # Process with ADK Orchestrator (sequential agents + context engineering)
-        results = orchestrator.process_artifact(filepath, restoration_level, time_span)
-        
-        # Extract results from sequential agent outputs
-        vision_data = results.get('vision_analysis', {})
-        restoration_data = results.get('restoration', {})
-        historical_data = results.get('historical_context', {})
-        environmental_data = results.get('environmental_prediction', {})
-        
-        # Format response to match frontend expectations
-        response_data = {
-            'success': results.get('workflow_status') == 'completed',
-            'results': {
-                'workflow_status': results.get('workflow_status'),
-                'agents_executed': results.get('agents_executed', []),
-                'context_summary': results.get('context_summary', {}),
-                'original_image': original_image_b64,
-                'restored_image': results.get('restored_image'),
-                'time_span': time_span,
-                'restoration': {
-                    'status': restoration_data.get('status', 'error'),
-                    'message': 'AI-generated pristine restoration completed' if restoration_data.get('status') == 'success' else 'Restoration failed',
-                    'response': vision_data.get('identification', ''),
-                    'restoration_details': f"Method: {restoration_data.get('restoration_method', 'N/A')} | Level: {restoration_level}",
-                    'artifact_type': vision_data.get('type', 'Unknown'),
-                    'condition': vision_data.get('condition', 'Unknown')
-                },
-                'data_fetcher': {
-                    'status': historical_data.get('status', 'error'),
-                    'message': 'Historical context retrieved via ADK' if historical_data.get('status') == 'success' else 'Historical retrieval failed',
-                    'historical_data': historical_data.get('historical_context', '')
-                },
-                'environmental': {
-                    'status': environmental_data.get('status', 'error'),
-                    'message': f'Environmental predictions for {time_span} years via ADK' if environmental_data.get('status') == 'success' else 'Environmental prediction failed',
-                    'time_span': time_span,
-                    'environmental_analysis': environmental_data.get('predictions', '')
-                },
-                'degradation_predictions': environmental_data.get('degradation_timeline', [])
-            }
-        }
+        queue = get_job_queue()
+        if queue is not None:
+            # Hand the workflow to an RQ worker; the client polls status_url
+            file.save(filepath)
+            try:
+                job = queue.enqueue(
+                    run_pipeline, filepath, restoration_level, time_span,
+                    job_timeout=ADKConfig.JOB_TIMEOUT, result_ttl=ADKConfig.JOB_RESULT_TTL
+                )
+            except Exception:
+                # No worker will ever pick this upload up
+                discard_upload(filepath)
+                raise
+            return jsonify({
+                'success': False,
+                'job_id': job.id,
+                'status_url': url_for('job_status', job_id=job.id)
+            }), 202
         
-        # Clean up uploaded file
-        try:
-            os.remove(filepath)
-        except:
-            pass
+        # Process with ADK Orchestrator (sequential agents + context engineering)
+        payload = run_pipeline(filepath, restoration_level, time_span, _save_upload(file, filepath))
+        response_data = _build_response(payload, restoration_level, time_span)
         
         return jsonify(response_data)
         
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        traceback.print_exc()
+        # Traceback goes to the server log only, never to the client
+        app.logger.exception("process_artifact failed")
         return jsonify({
             'success': False,
-            'error': str(e),
-            'traceback': traceback.format_exc()
+            'error': str(e)
         }), 500
 
 
+@app.route('/job/<job_id>')
+def job_status(job_id):
+    """Poll a queued workflow; returns the /process_artifact response once finished"""
+    queue = get_job_queue()
+    if queue is None:
+        return jsonify({'success': False, 'error': 'Background jobs are not enabled'}), 404
+    # rq is only importable once get_job_queue() has found it
+    from rq.exceptions import NoSuchJobError
+    from rq.job import Job
+    
+    try:
+        job = Job.fetch(job_id, connection=queue.connection)
+    except NoSuchJobError:
+        return jsonify({'success': False, 'error': 'Unknown or expired job'}), 404
+    
+    status = job.get_status()
+    if status == 'finished':
+        _, restoration_level, time_span = job.args
+        return jsonify(_build_response(job.result, restoration_level, time_span))
+    if status in ('failed', 'stopped', 'canceled'):
+        app.logger.error("Job %s %s:\n%s", job_id, status, job.exc_info)
+        return jsonify({'success': False, 'error': f'Workflow {status}'}), 500
+    return jsonify({'success': False, 'status': status}), 202
+
+
+@app.route('/restored_image/<path:filename>')
+def restored_image(filename):
+    """Serve a restored image with ETag / Range support instead of inlining it as base64"""
+    return send_from_directory(RESTORED_DIR, filename, conditional=True)
+
+
 @app.route('/dashboard')
 def dashboard():
     """Dashboard to display results"""
@@ -158,6 +311,7 @@ def health():
 
 
 if __name__ == '__main__':
+    configure_logging(log_file=ADKConfig.LOG_FILE)
     print("\n" + "="*70)
     print("ARTIFACT RESTORATION SYSTEM")
     print("    Powered by Google ADK Sequential Agents + MCP + Context Engineering")
@@ -170,5 +324,6 @@ if __name__ == '__main__':
     print("  MCP Tools: ENABLED (Model Context Protocol)")
     print("  ADK Runners: ENABLED (Historical + Environmental agents)")
     print("\n[INFO] Debug mode disabled (Windows compatibility)")
+    print("[INFO] For concurrent users run: gunicorn -k gthread -w 2 --threads 8 app:app")
     print("\n")
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -0,0 +1,10 @@
+"""
+pytest setup: imports resolve from this directory, as when running app.py
+"""
+import os
+
+# test_adk_setup.py is a manual script that calls the live APIs at import
+collect_ignore = ["test_adk_setup.py"]
+
+# setup_adk refuses to import without a key; tests never reach the API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
@@ -0,0 +1,152 @@
+"""
+Artifact workflow jobs, run in the request or by an RQ worker
+
+Start a worker with
+`rq worker --worker-class rq.SimpleWorker --url $ADK_REDIS_URL artifact_restoration`
+from this directory. SimpleWorker runs jobs in the worker process, so the
+orchestrator and its models are built once rather than after every fork.
+Without ADK_REDIS_URL (or without rq installed) the Flask app runs the
+workflow inside the request as before. Workers must mount the same
+ADK_UPLOAD_DIR and ADK_RESTORED_DIR as the web hosts.
+"""
+import base64
+import functools
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+# Loads .env and configures Gemini, also when imported by an RQ worker
+import setup_adk  # noqa: F401
+from adk_config import ADKConfig, configure_logging
+from tools.restoration_tools import RESTORED_DIR
+
+try:
+    import pybase64  # SIMD (AVX2/SSSE3) base64 codec
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+try:
+    from redis import Redis
+    from rq import Queue
+    RQ_AVAILABLE = True
+except ImportError:
+    RQ_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Finished uploads are renamed into this subdirectory of their folder and
+# deleted later by the janitor thread, off the request path
+TRASH_SUBDIR = ".trash"
+JANITOR_INTERVAL = 30  # seconds between sweeps
+TRASH_MAX_AGE = 60  # seconds a trashed file is kept
+
+
+def b64encode(data: bytes) -> str:
+    """Base64-encode image bytes as str, using pybase64 when installed"""
+    if PYBASE64_AVAILABLE:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode('utf-8')
+
+
+def run_pipeline(filepath: str, restoration_level: str = "medium", time_span: int = 10,
+                 original_image_b64: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the orchestrator on an uploaded image and remove the upload
+    
+    Args:
+        filepath: Saved upload
+        restoration_level: Restoration intensity (light/medium/high)
+        time_span: Years for degradation prediction
+        original_image_b64: Upload already encoded by the caller (in-request
+            runs); when omitted (queued jobs) the upload is kept in
+            RESTORED_DIR instead, so the result stays small in Redis
+        
+    Returns:
+        {"results": orchestrator results, "original_image": base64 upload},
+        or {"results": ..., "original_image_file": name in RESTORED_DIR}
+    """
+    from adk_orchestrator import get_orchestrator
+    
+    # No-op in the web app, which configures logging per request; RQ
+    # workers otherwise drop the orchestrator's log records
+    configure_logging(log_file=ADKConfig.LOG_FILE)
+    # Expire restorations in whichever process writes them (web or RQ worker)
+    start_janitor(RESTORED_DIR, ADKConfig.RESTORED_IMAGE_TTL)
+    try:
+        results = get_orchestrator().process_artifact(filepath, restoration_level, time_span)
+    except BaseException:
+        discard_upload(filepath)
+        raise
+    
+    if original_image_b64 is not None:
+        discard_upload(filepath)
+        return {"results": results, "original_image": original_image_b64}
+    return {"results": results, "original_image_file": keep_original(filepath)}
+
+
+def keep_original(filepath: str) -> str:
+    """Move a queued upload into RESTORED_DIR, served by URL and expired with the restorations"""
+    os.makedirs(RESTORED_DIR, exist_ok=True)
+    name = f"original-{os.path.basename(filepath)}"
+    shutil.move(filepath, os.path.join(RESTORED_DIR, name))
+    return name
+
+
+def discard_upload(filepath: str):
+    """Move an upload into its folder's trash (an atomic rename) for the janitor to delete"""
+    trash_dir = os.path.join(os.path.dirname(filepath), TRASH_SUBDIR)
+    try:
+        os.makedirs(trash_dir, exist_ok=True)
+        os.replace(filepath, os.path.join(trash_dir, f"{os.path.basename(filepath)}.{uuid.uuid4().hex}"))
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logger.warning("Could not discard upload %s", filepath, exc_info=True)
+
+
+def _sweep(directory: str, max_age: float):
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not delete %s", entry.path, exc_info=True)
+
+
+def start_upload_janitor(upload_dir: str) -> threading.Thread:
+    """Start (once per folder) the janitor that empties upload_dir's trash"""
+    return start_janitor(os.path.join(upload_dir, TRASH_SUBDIR), TRASH_MAX_AGE)
+
+
+@functools.lru_cache(maxsize=None)
+def start_janitor(directory: str, max_age: float) -> threading.Thread:
+    """Start (once per directory) the daemon thread deleting its files older than max_age seconds"""
+    
+    def run():
+        while True:
+            _sweep(directory, max_age)
+            time.sleep(JANITOR_INTERVAL)
+    
+    thread = threading.Thread(target=run, name=f"janitor-{os.path.basename(directory)}", daemon=True)
+    thread.start()
+    return thread
+
+
+@functools.lru_cache(maxsize=1)
+def get_job_queue() -> Optional["Queue"]:
+    """RQ queue for workflows, or None when they should run in the request"""
+    if not (RQ_AVAILABLE and ADKConfig.REDIS_URL):
+        return None
+    return Queue(ADKConfig.JOB_QUEUE, connection=Redis.from_url(ADKConfig.REDIS_URL))
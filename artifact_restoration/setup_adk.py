@@ -4,7 +4,8 @@ Setup and Authentication for Google Gemini API
 import os
 import sys
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from adk_config import configure_genai
 
 # Fix encoding for Windows when running in background
 if sys.platform == 'win32':
@@ -24,8 +25,8 @@ try:
     os.environ["GEMINI_API_KEY"] = GEMINI_API_KEY
     os.environ["GOOGLE_API_KEY"] = GEMINI_API_KEY
     
-    # Configure Gemini
-    genai.configure(api_key=GEMINI_API_KEY)
+    # Configure Gemini (shared transport used by every agent)
+    configure_genai()
     
     print("[OK] Setup and authentication complete.")
     
@@ -0,0 +1,48 @@
+"""
+Upload handling in the Flask app
+"""
+import base64
+import io
+import os
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("pydantic")
+
+import app as app_module
+
+
+class _Upload:
+    """Minimal stand-in for werkzeug's FileStorage (only .stream is read)"""
+    
+    def __init__(self, data: bytes):
+        self.stream = io.BytesIO(data)
+
+
+@pytest.mark.parametrize("size", [
+    0,
+    1,
+    app_module._UPLOAD_CHUNK_SIZE - 1,
+    app_module._UPLOAD_CHUNK_SIZE,
+    app_module._UPLOAD_CHUNK_SIZE + 1,
+    3 * app_module._UPLOAD_CHUNK_SIZE + 2,
+])
+def test_save_upload_matches_whole_file_base64(tmp_path, size):
+    data = os.urandom(size)
+    filepath = tmp_path / "upload.jpg"
+    
+    encoded = app_module._save_upload(_Upload(data), str(filepath))
+    
+    assert encoded == base64.b64encode(data).decode("ascii")
+    assert filepath.read_bytes() == data
+
+
+def test_save_upload_never_overwrites(tmp_path):
+    filepath = tmp_path / "upload.jpg"
+    filepath.write_bytes(b"existing")
+    
+    with pytest.raises(FileExistsError):
+        app_module._save_upload(_Upload(b"new"), str(filepath))
+    assert filepath.read_bytes() == b"existing"
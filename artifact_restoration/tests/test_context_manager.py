@@ -0,0 +1,38 @@
+"""
+ContextManager prompt memoization
+"""
+from adk_config import ContextManager
+
+
+def test_build_context_prompt_is_memoized_until_context_changes():
+    cm = ContextManager()
+    cm.set_artifact_context("image_path", "a.jpg")
+    
+    first = cm.build_context_prompt("historical")
+    assert cm.build_context_prompt("historical") is first
+
+
+def test_store_agent_output_invalidates_cached_prompt():
+    cm = ContextManager()
+    cm.set_artifact_context("image_path", "a.jpg")
+    before = cm.build_context_prompt("historical")
+    assert "PREVIOUS AGENT OUTPUTS" not in before
+    
+    cm.store_agent_output("vision", summary="type: vase")
+    after = cm.build_context_prompt("historical")
+    assert "--- vision Output ---\ntype: vase" in after
+    
+    # Overwriting an output with new content is picked up as well
+    cm.store_agent_output("vision", summary="type: statue")
+    latest = cm.build_context_prompt("historical")
+    assert "type: statue" in latest
+    assert "type: vase" not in latest
+
+
+def test_unkeyed_outputs_drop_binary_fields_from_prompt():
+    cm = ContextManager()
+    cm.store_agent_output("custom", artifacts={"status": "success", "image_base64": "AAAA"})
+    
+    prompt = cm.build_context_prompt("next")
+    assert '"status": "success"' in prompt
+    assert "AAAA" not in prompt
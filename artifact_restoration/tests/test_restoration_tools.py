@@ -0,0 +1,54 @@
+"""
+predict_degradation conditions and timeline
+"""
+import pytest
+
+pytest.importorskip("pydantic")  # restoration_tools imports adk_schemas
+
+from tools.restoration_tools import predict_degradation, thaw_degradation
+
+
+@pytest.mark.parametrize("years, condition", [
+    (19, "Excellent"),  # 9.5% degraded
+    (20, "Good"),  # 10%: each threshold starts the next condition
+    (49, "Good"),
+    (50, "Fair"),  # 25%
+    (99, "Fair"),
+    (100, "Poor"),  # 50%
+    (149, "Poor"),
+    (150, "Critical"),  # 75%
+    (400, "Critical"),  # capped at 100%
+])
+def test_condition_thresholds(years, condition):
+    # Glass degrades at 0.5%/year
+    result = predict_degradation("glass", years)
+    assert result["condition"].startswith(condition)
+    assert result["degradation_percentage"] == min(0.5 * years, 100)
+
+
+def test_timeline_points_and_labels():
+    result = predict_degradation("canvas", 10)
+    
+    timeline = result["timeline"]
+    assert [point["year"] for point in timeline] == [2, 5, 8, 10]
+    assert timeline[-1]["condition"] == "Fair - Noticeable degradation, some detail loss (35% degraded)"
+
+
+def test_short_span_timeline_has_no_duplicate_years():
+    timeline = predict_degradation("canvas", 1)["timeline"]
+    assert [point["year"] for point in timeline] == [1]
+
+
+@pytest.mark.parametrize("years", [0, -5])
+def test_non_positive_span_has_empty_timeline(years):
+    assert predict_degradation("canvas", years)["timeline"] == ()
+
+
+def test_results_are_read_only_until_thawed():
+    result = predict_degradation("stone", 10)
+    with pytest.raises(TypeError):
+        result["status"] = "changed"
+    
+    thawed = thaw_degradation(result)
+    thawed["timeline"][0]["year"] = 0
+    assert predict_degradation("stone", 10)["timeline"][0]["year"] != 0
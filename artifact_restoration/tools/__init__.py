@@ -3,6 +3,7 @@ Tools Module
 Custom tools for artifact restoration using Google ADK
 """
 
-from .restoration_tools import restore_artifact_image, predict_degradation
+from .restoration_tools import restore_artifact_image, predict_degradation, thaw_degradation
+from .cache_tools import ResultCache, hash_file
 
-__all__ = ['restore_artifact_image', 'predict_degradation']
+__all__ = ['restore_artifact_image', 'predict_degradation', 'thaw_degradation', 'ResultCache', 'hash_file']
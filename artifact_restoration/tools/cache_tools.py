@@ -0,0 +1,184 @@
+"""
+Result caches for agent outputs (content-addressed and semantic)
+"""
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+try:
+    import faiss
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """Hash file contents so identical uploads share cache entries.
+
+    Args:
+        path: File to hash
+        chunk_size: Bytes read per iteration
+
+    Returns:
+        Hex digest of the file bytes (BLAKE2b)
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU cache of agent results, persisted under directory when one is given
+
+    With a directory, entries live in diskcache if installed, otherwise as
+    one JSON file per key (values must then be JSON-serializable; file
+    mtimes track recency). Without a directory they are kept in an
+    in-process LRU. Every mode is bounded by max_items (diskcache through
+    an equivalent size limit).
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_items: int = 256):
+        self.max_items = max_items
+        # diskcache bounds total size, not entry count; budget 64 KB per
+        # entry, ample for the text results stored here
+        self._disk = (diskcache.Cache(directory, eviction_policy='least-recently-used',
+                                      size_limit=max_items * 64 * 1024)
+                      if directory and DISKCACHE_AVAILABLE else None)
+        self._json_dir = directory if directory and self._disk is None else None
+        if self._json_dir:
+            os.makedirs(self._json_dir, exist_ok=True)
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _json_path(self, key: str) -> str:
+        return os.path.join(self._json_dir, hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+    def get(self, key: str) -> Any:
+        """Return the cached value or None on miss"""
+        if self._disk is not None:
+            return self._disk.get(key)
+        if self._json_dir:
+            path = self._json_path(key)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    value = json.load(f)
+                os.utime(path)
+                return value
+            except (OSError, ValueError):
+                return None
+        with self._lock:
+            if key not in self._memory:
+                return None
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+    def set(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entry when full"""
+        if self._disk is not None:
+            self._disk.set(key, value)
+            return
+        if self._json_dir:
+            # Write then rename so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self._json_dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, default=str)
+            os.replace(tmp_path, self._json_path(key))
+            self._evict_json()
+            return
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _evict_json(self):
+        """Delete the least recently used JSON entries beyond max_items"""
+        entries = []
+        for entry in os.scandir(self._json_dir):
+            if entry.name.endswith('.json'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_items:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_items]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # removed by another worker
+
+    def clear(self):
+        """Drop all cached results"""
+        if self._disk is not None:
+            self._disk.clear()
+        if self._json_dir:
+            for name in os.listdir(self._json_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self._json_dir, name))
+        with self._lock:
+            self._memory.clear()
+
+
+class SemanticCache:
+    """Response cache matched on text embedding similarity
+
+    Each namespace has its own FAISS inner-product index over normalized
+    embeddings, so scores are cosine similarities. Callers put everything
+    that must match exactly (agent, model, numeric parameters) in the
+    namespace and embed only the free-text part of the request.
+    """
+
+    def __init__(self, model_name: str, threshold: float = 0.92):
+        self.threshold = threshold
+        self._encoder = SentenceTransformer(model_name)
+        self._indexes: Dict[str, "faiss.IndexFlatIP"] = {}
+        self._responses: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def embed(self, text: str):
+        """Normalized float32 embedding of shape (1, dim)"""
+        return self._encoder.encode([text], normalize_embeddings=True).astype('float32')
+
+    def get(self, namespace: str, embedding) -> Optional[str]:
+        """Return the closest cached response at or above the threshold"""
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None or index.ntotal == 0:
+                return None
+            scores, ids = index.search(embedding, 1)
+            if scores[0][0] < self.threshold:
+                return None
+            return self._responses[namespace][ids[0][0]]
+
+    def add(self, namespace: str, embedding, response: str):
+        """Insert a response under its prompt embedding"""
+        with self._lock:
+            if namespace not in self._indexes:
+                self._indexes[namespace] = faiss.IndexFlatIP(embedding.shape[1])
+                self._responses[namespace] = []
+            self._indexes[namespace].add(embedding)
+            self._responses[namespace].append(response)
+
+
+@functools.lru_cache(maxsize=1)
+def get_semantic_cache(model_name: str, threshold: float) -> Optional[SemanticCache]:
+    """Process-wide semantic cache (loads the embedding model once), or None if unavailable"""
+    if not SEMANTIC_CACHE_AVAILABLE:
+        return None
+    return SemanticCache(model_name, threshold)
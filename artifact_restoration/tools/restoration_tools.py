@@ -1,40 +1,123 @@
 """
 Restoration Tools for ADK Agents
 """
-from PIL import Image, ImageEnhance, ImageFilter, ImageDraw
-import google.generativeai as genai
+from PIL import Image, ImageEnhance, ImageFilter, ImageDraw, ImageOps
+import bisect
+import functools
+import hashlib
+import logging
 import os
-import base64
-from io import BytesIO
-from typing import Dict
+import tempfile
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
 import requests
+from requests.adapters import HTTPAdapter
+
+import json
+
+from adk_config import configure_logging, get_model
+from adk_schemas import ArtifactIdentification
+from .cache_tools import hash_file
+
+logger = logging.getLogger(__name__)
 
 try:
     from openai import OpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
-    print("[WARNING] OpenAI library not available. Image generation will use fallback method.")
+    logger.warning("OpenAI library not available. Image generation will use fallback method.")
+
+try:
+    # libjpeg-turbo's SIMD encoder (fed NumPy arrays); TurboJPEG() raises if
+    # the shared library is missing
+    import numpy as np
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbo_jpeg = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except (ImportError, OSError, RuntimeError):
+    TURBOJPEG_AVAILABLE = False
+
+VISION_MODEL = 'gemini-2.0-flash'
+# Bump when the identification prompt changes so cached results are not reused
+VISION_PROMPT_VERSION = "2"
+
+# Restored images are written here once and passed around by path; files
+# are named after their inputs and expire via the janitor (see jobs.py)
+RESTORED_DIR = os.getenv('ADK_RESTORED_DIR') or os.path.join(tempfile.gettempdir(), 'artifact_restorations')
+
+
+# Keep-alive pool for downloading generated images from the OpenAI CDN
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
+
+
+def _restored_path(image_key: str, restoration_level: str, artifact_type: str, suffix: str) -> str:
+    """Content-addressed file in RESTORED_DIR for one restoration request
+
+    Repeat requests overwrite the same file instead of adding a new one.
+    """
+    name = hashlib.blake2b(f"{image_key}:{restoration_level}:{artifact_type}".encode(),
+                           digest_size=20).hexdigest()
+    return os.path.join(RESTORED_DIR, name + suffix)
+
+
+def _temp_restored_path() -> str:
+    """Scratch file in RESTORED_DIR, renamed over the final path once complete"""
+    os.makedirs(RESTORED_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix='.tmp', dir=RESTORED_DIR)
+    os.close(fd)
+    return path
+
+
+# Longest side sent to Gemini; the SDK would downscale larger images anyway
+GEMINI_MAX_SIDE = 1568
+
+
+def fit_for_gemini(img: Image.Image) -> Image.Image:
+    """Downscaled copy of img for upload to Gemini, or img itself if already small enough
+
+    The input is never modified, so a preloaded image can still be used
+    at full resolution for restoration output.
+    """
+    if max(img.size) <= GEMINI_MAX_SIDE:
+        return img
+    return ImageOps.contain(img, (GEMINI_MAX_SIDE, GEMINI_MAX_SIDE), Image.Resampling.LANCZOS)
+
 
+def _save_jpeg(img: Image.Image, path: str, quality: int = 95):
+    """Write an RGB image as JPEG, with libjpeg-turbo when available"""
+    if not TURBOJPEG_AVAILABLE:
+        img.save(path, format="JPEG", quality=quality)
+        return
+    jpeg_bytes = _turbo_jpeg.encode(np.asarray(img), quality=quality, pixel_format=TJPF_RGB)
+    with open(path, 'wb') as f:
+        f.write(jpeg_bytes)
 
-def identify_artifact_with_vision(image_path: str) -> dict:
+
+@functools.lru_cache(maxsize=None)
+def _openai_client(api_key: str):
+    """Process-wide OpenAI client per key, so DALL-E calls reuse its connection pool"""
+    return OpenAI(api_key=api_key)
+
+
+def identify_artifact_with_vision(image_path: str, structured: bool = False,
+                                  preloaded_image: Optional[Image.Image] = None) -> dict:
     """Use Google Gemini Vision to identify artifact details.
     
     Args:
         image_path: Path to the artifact image
+        structured: Request JSON matching ArtifactIdentification instead of
+                 labelled text lines; parsed fields are returned under "fields"
+        preloaded_image: The same image already opened by the caller, so it
+                 is decoded once when restore_artifact_image also needs it
         
     Returns:
         Dictionary with artifact identification details
     """
     try:
-        api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-        genai.configure(api_key=api_key)
-        
         # Use Gemini Vision model
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # Open image
-        img = Image.open(image_path)
+        model = get_model(VISION_MODEL, response_schema=ArtifactIdentification if structured else None)
         
         prompt = """Analyze this artifact image carefully and provide PRECISE identification:
 
@@ -62,13 +145,26 @@ CONFIDENCE: [High/Medium/Low - how confident are you this identification is corr
 
 BE ACCURATE: If this is a sculpture or statue, do NOT call it a painting. If it's pottery, do NOT call it a sculpture. Look at the actual form and material."""
         
-        response = model.generate_content([prompt, img])
+        if structured:
+            prompt += """
+
+Return the fields as JSON: artifact_name, type, material, period, origin, location, condition, description and confidence as above; damage and missing_parts as lists of short phrases."""
         
-        return {
+        if preloaded_image is not None:
+            response = model.generate_content([prompt, fit_for_gemini(preloaded_image)])
+        else:
+            # Opened here, so closed here
+            with Image.open(image_path) as img:
+                response = model.generate_content([prompt, fit_for_gemini(img)])
+        
+        result = {
             "status": "success",
             "identification": response.text,
             "has_vision_data": True
         }
+        if structured:
+            result["fields"] = json.loads(response.text)
+        return result
         
     except Exception as e:
         return {
@@ -78,16 +174,26 @@ BE ACCURATE: If this is a sculpture or statue, do NOT call it a painting. If it'
         }
 
 
-def restore_artifact_image(image_path: str, restoration_level: str = "medium", artifact_type: str = "unknown") -> dict:
+def restore_artifact_image(image_path: str, restoration_level: str = "medium", artifact_type: str = "unknown",
+                           reconstruction_description: str = None,
+                           preloaded_image: Optional[Image.Image] = None,
+                           image_key: Optional[str] = None) -> dict:
     """Generates an image showing how the artifact looked when originally created using AI.
     
     Args:
         image_path: The file path to the artifact image
         restoration_level: "light", "medium", or "heavy"
         artifact_type: Type of artifact ("painting", "sculpture", "monument", "pottery", etc.)
+        reconstruction_description: Pristine-state description if already available;
+                 skips the Gemini reconstruction analysis call
+        preloaded_image: The same image already opened by the caller (see
+                 identify_artifact_with_vision)
+        image_key: hash_file digest of image_path, if the caller already has
+                 it; names the restored file
     
     Returns:
-        Dictionary with AI-generated image of original pristine state
+        Dictionary with AI-generated image of original pristine state, saved
+        to the file at "restored_image_path"
     """
     try:
         if not os.path.exists(image_path):
@@ -96,18 +202,24 @@ def restore_artifact_image(image_path: str, restoration_level: str = "medium", a
                 "error_message": f"Image not found: {image_path}"
             }
         
-        img = Image.open(image_path).convert('RGB')
+        if image_key is None:
+            image_key = hash_file(image_path)
+        
+        if preloaded_image is not None:
+            img = preloaded_image.convert('RGB')
+        else:
+            with Image.open(image_path) as opened:
+                img = opened.convert('RGB')
         artifact_type_lower = artifact_type.lower()
         
         # Get API keys
-        gemini_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
         openai_key = os.getenv('OPENAI_API_KEY')
         
         # Step 1: Use Gemini to analyze what needs to be reconstructed
-        genai.configure(api_key=gemini_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        analysis_prompt = f"""Analyze this damaged {artifact_type} image in extreme detail:
+        if not reconstruction_description:
+            model = get_model(VISION_MODEL)
+            
+            analysis_prompt = f"""Analyze this damaged {artifact_type} image in extreme detail:
 
 1. What parts are MISSING or BROKEN? (arms, nose, fingers, legs, decorative elements, etc.)
 2. What is the material? (marble, bronze, terracotta, canvas, wood, etc.)
@@ -116,15 +228,15 @@ def restore_artifact_image(image_path: str, restoration_level: str = "medium", a
 
 Describe the PERFECT, UNDAMAGED version with ALL missing parts reconstructed in vivid visual detail."""
 
-        analysis_response = model.generate_content([analysis_prompt, img])
-        reconstruction_description = analysis_response.text
+            analysis_response = model.generate_content([analysis_prompt, fit_for_gemini(img)])
+            reconstruction_description = analysis_response.text
         
         # Step 2: Try to generate pristine image using OpenAI DALL-E
         if OPENAI_AVAILABLE and openai_key:
             try:
-                print("[INFO] Attempting to generate pristine image using OpenAI DALL-E...")
+                logger.info("Attempting to generate pristine image using OpenAI DALL-E...")
                 
-                client = OpenAI(api_key=openai_key)
+                client = _openai_client(openai_key)
                 
                 # Create detailed generation prompt
                 dalle_prompt = f"""A perfect, pristine, museum-quality photograph of a complete {artifact_type} in its original condition when first created. 
@@ -151,29 +263,35 @@ Show the magnificent artifact exactly as it appeared when first completed."""
                 
                 # Download generated image
                 image_url = response.data[0].url
-                img_response = requests.get(image_url)
-                
-                if img_response.status_code == 200:
-                    generated_image_base64 = base64.b64encode(img_response.content).decode('utf-8')
+                # Stream straight to the restored file instead of buffering the PNG
+                with _http.get(image_url, stream=True, timeout=30) as img_response:
+                    if img_response.status_code != 200:
+                        raise Exception(f"Failed to download generated image: {img_response.status_code}")
                     
-                    return {
-                        "status": "success",
-                        "message": f"AI-generated pristine {artifact_type} using DALL-E 3",
-                        "restored_image_base64": generated_image_base64,
-                        "restoration_level": restoration_level,
-                        "artifact_type": artifact_type,
-                        "reconstruction_description": reconstruction_description,
-                        "generation_method": "OpenAI DALL-E 3 - Full Reconstruction",
-                        "note": "This is an AI-generated image showing how the artifact looked when originally created with all parts intact"
-                    }
-                else:
-                    raise Exception(f"Failed to download generated image: {img_response.status_code}")
+                    tmp_path = _temp_restored_path()
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in img_response.iter_content(chunk_size=64 * 1024):
+                            f.write(chunk)
+                    restored_path = _restored_path(image_key, restoration_level, artifact_type, '.png')
+                    os.replace(tmp_path, restored_path)
+                
+                result = {
+                    "status": "success",
+                    "message": f"AI-generated pristine {artifact_type} using DALL-E 3",
+                    "restored_image_path": restored_path,
+                    "restoration_level": restoration_level,
+                    "artifact_type": artifact_type,
+                    "reconstruction_description": reconstruction_description,
+                    "generation_method": "OpenAI DALL-E 3 - Full Reconstruction",
+                    "note": "This is an AI-generated image showing how the artifact looked when originally created with all parts intact"
+                }
+                return result
                     
             except Exception as e:
-                print(f"[WARNING] DALL-E generation failed: {e}. Using enhanced fallback.")
+                logger.warning("DALL-E generation failed: %s. Using enhanced fallback.", e)
         
         # Fallback: Enhanced existing image with detailed description
-        print("[INFO] Using enhanced image with AI reconstruction description...")
+        logger.info("Using enhanced image with AI reconstruction description...")
         
         # Apply strong enhancement to show what we can
         enhancer = ImageEnhance.Contrast(img)
@@ -188,15 +306,16 @@ Show the magnificent artifact exactly as it appeared when first completed."""
         enhancer = ImageEnhance.Brightness(img)
         img = enhancer.enhance(1.15)
         
-        # Convert to base64
-        buffered = BytesIO()
-        img.save(buffered, format="JPEG", quality=95)
-        img_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
+        # Write once; callers encode for transport only if they need to
+        tmp_path = _temp_restored_path()
+        _save_jpeg(img, tmp_path)
+        restored_path = _restored_path(image_key, restoration_level, artifact_type, '.jpg')
+        os.replace(tmp_path, restored_path)
         
         return {
             "status": "success",
             "message": f"Enhanced {artifact_type} with AI reconstruction guidance",
-            "restored_image_base64": img_base64,
+            "restored_image_path": restored_path,
             "restoration_level": restoration_level,
             "artifact_type": artifact_type,
             "reconstruction_description": reconstruction_description,
@@ -205,70 +324,97 @@ Show the magnificent artifact exactly as it appeared when first completed."""
         }
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Restoration failed")
         return {
             "status": "error",
             "error_message": f"Restoration failed: {str(e)}"
         }
 
 
-def predict_degradation(material: str, years: int) -> dict:
+# Degradation rates by material (percentage per year)
+_DEGRADATION_RATES = {
+    "paper": 4.5,
+    "canvas": 3.5,
+    "wood": 2.8,
+    "textile": 4.0,
+    "stone": 0.8,
+    "metal": 1.5,
+    "ceramic": 1.0,
+    "glass": 0.5
+}
+
+# Degradation percentage upper bounds for each condition but the last
+_CONDITION_THRESHOLDS = (10, 25, 50, 75)
+_CONDITIONS = (
+    "Excellent - Minimal changes",
+    "Good - Minor surface wear",
+    "Fair - Noticeable degradation, some detail loss",
+    "Poor - Significant deterioration",
+    "Critical - Severe damage, major restoration required"
+)
+
+# Fractions of the prediction span plotted on the dashboard timeline
+_TIMELINE_FRACTIONS = (0.25, 0.5, 0.75, 1.0)
+
+
+def _condition_for(degradation: float) -> str:
+    return _CONDITIONS[bisect.bisect_right(_CONDITION_THRESHOLDS, degradation)]
+
+
+@functools.lru_cache(maxsize=4096)
+def predict_degradation(material: str, years: int) -> Mapping[str, Any]:
     """Predicts how an artifact will degrade over time based on its material.
     
+    Results are cached per (material, years) and returned read-only; use
+    thaw_degradation for a copy that can be stored or serialized.
+    
     Args:
         material: The primary material of the artifact (e.g., "canvas", "paper", 
                  "stone", "wood", "metal", "textile").
         years: Number of years into the future to predict degradation (1-100).
     
     Returns:
-        Dictionary with degradation prediction.
+        Read-only mapping with degradation prediction.
         Success: {
             "status": "success",
             "material": "canvas",
             "years": 10,
             "degradation_percentage": 35,
-            "condition": "Fair - Noticeable degradation, some detail loss"
+            "condition": "Fair - Noticeable degradation, some detail loss",
+            "timeline": [{"year": 2, "condition": "Excellent - Minimal changes (7% degraded)"}, ...]
         }
     """
-    # Degradation rates by material (percentage per year)
-    degradation_rates = {
-        "paper": 4.5,
-        "canvas": 3.5,
-        "wood": 2.8,
-        "textile": 4.0,
-        "stone": 0.8,
-        "metal": 1.5,
-        "ceramic": 1.0,
-        "glass": 0.5
-    }
-    
-    material_lower = material.lower()
-    rate = degradation_rates.get(material_lower, 3.0)
+    rate = _DEGRADATION_RATES.get(material.lower(), 3.0)
     degradation = min(rate * years, 100)
     
-    # Determine condition
-    if degradation < 10:
-        condition = "Excellent - Minimal changes"
-    elif degradation < 25:
-        condition = "Good - Minor surface wear"
-    elif degradation < 50:
-        condition = "Fair - Noticeable degradation, some detail loss"
-    elif degradation < 75:
-        condition = "Poor - Significant deterioration"
-    else:
-        condition = "Critical - Severe damage, major restoration required"
+    # Dashboard reads the "N%" in each condition to plot the chart; no
+    # points for years <= 0 (the max(1, ...) would invent a year-1 point)
+    timeline = []
+    fractions = _TIMELINE_FRACTIONS if years > 0 else ()
+    for year in dict.fromkeys(max(1, round(years * fraction)) for fraction in fractions):
+        point = min(rate * year, 100)
+        timeline.append(MappingProxyType({
+            "year": year,
+            "condition": f"{_condition_for(point)} ({round(point)}% degraded)"
+        }))
     
-    return {
+    return MappingProxyType({
         "status": "success",
         "material": material,
         "years": years,
         "degradation_percentage": round(degradation, 1),
-        "condition": condition
-    }
+        "condition": _condition_for(degradation),
+        "timeline": tuple(timeline)
+    })
+
+
+def thaw_degradation(degradation_data: Mapping[str, Any]) -> Dict[str, Any]:
+    """Mutable copy of a predict_degradation result (picklable and JSON-serializable)"""
+    return {**degradation_data, "timeline": [dict(point) for point in degradation_data["timeline"]]}
 
 
 # Test the functions
 if __name__ == "__main__":
-    print("✅ Restoration tools created")
-    print(f"📊 Test degradation: {predict_degradation('canvas', 10)}")
+    configure_logging()
+    logger.info("✅ Restoration tools created")
+    logger.info("📊 Test degradation: %s", predict_degradation('canvas', 10))